@@ -1,130 +1,167 @@
+import asyncio
 import random
-import math
 import re
-import datetime
-from nltk.tokenize import RegexpTokenizer, word_tokenize
-from nltk.metrics import edit_distance
-import pgeocode
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-
-# Commented out elements with '#!' are used for testing purposes
-# Global Variables represting menu items
-drinks_menu = {
-    'strawberry pineapple explosion': 4.30,
-    'unicorn confetti': 3.75,
-    'stormy pouf': 3.75,
-    'original milk tea': 3.50,
-    'sunshine yogurt': 4.50
-    }
+import time
+from functools import lru_cache
+from spelling import correction_index
+from intents import ORDER_COMMANDS, compile_intents, handled
+from transports import StdioTransport
+from tokens import (CleanedText, corrected, keywords_only, resolved, tokenize,
+                    words_of)
+import sentiment
+import pricing
+import orderlog
+import metrics
+from slots import SlotFiller
+from parsecache import DrinkTemplate, Parse, shared_cache
+from sessionstore import pack_drinks, unpack_drinks
+from menus import (base_drinks_menu, toppings_menu, size_menu, specials,
+                   SPECIAL_DISCOUNT, current_menu)
+
+# vaderSentiment and the geocoder (NumPy, pgeocode) are slow to import,
+# so they are only imported where they are first used. Call warmup() to pay
+# for them up front instead.
 
-toppings_menu = {
-    'tapioca pearls': 0.75,
-    'grass jelly': 1.5,
-    'red bean': 0.75,
-    'whipped cream': 1.00,
+# Conversations can be replayed without a terminal with replay.py
+# The menus live in menus.py; the bot serves from today's MenuSnapshot.
+# drinks_menu, big_menu, todays_special, day_of_the_week and
+# day_of_the_week_name are still readable here and always reflect the current
+# snapshot.
+_snapshot_names = {
+    "drinks_menu": lambda menu: menu.drinks,
+    "big_menu": lambda menu: menu.big_menu,
+    "todays_special": lambda menu: menu.special,
+    "day_of_the_week": lambda menu: menu.date.weekday(),
+    "day_of_the_week_name": lambda menu: menu.day_name,
     }
 
-drink_strings = (" ".join(drinks_menu.keys()))
-toppings_strings = (" ".join(toppings_menu.keys()))
+def __getattr__(name):
+    if name in _snapshot_names:
+        return _snapshot_names[name](current_menu())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-size_menu = {
-    'large': 1.00,
-    'medium': 0.5,
-    'small': 0
-    }
+# Str -> (stores.Store, Int)
+# The store delivering to origin_postal (the nearest open one) and the minutes
+# the delivery takes. geocoder and stores replace the default geo.Geocoder and
+# stores.StoreRegistry.
+@metrics.timed("distance")
+def delivery(origin_postal, geocoder=None, stores=None):
+    if geocoder is None:
+        from geo import default_geocoder
+        geocoder = default_geocoder()
+    if stores is None:
+        from stores import default_registry
+        stores = default_registry()
+    return stores.route(origin_postal, geocoder)
 
-specials = {
-    0: 'strawberry pineapple explosion',
-    1: 'unicorn confetti',
-    2: 'stormy pouf',
-    3: 'original milk tea',
-    4: 'sunshine yogurt'
-    }
+# Minutes for a delivery to origin_postal
+def distance(origin_postal, geocoder=None, stores=None):
+    return delivery(origin_postal, geocoder, stores)[1]
 
-day_of_the_week = datetime.datetime.today().weekday()
-day_of_the_week_name = datetime.datetime.now().strftime("%a")
-todays_special = specials[day_of_the_week]
-drinks_menu[todays_special] -= 1.5 # represents the daily special discount
-big_menu ={**size_menu, **toppings_menu, **drinks_menu}
-# Global variables end here
-
-# Haversine forumla for measuring distance between points
-def distance(origin_postal):
-    nomi = pgeocode.Nominatim('ca')
-    lat1 = nomi.query_postal_code(origin_postal).latitude
-    lon1 = nomi.query_postal_code(origin_postal).longitude
-    lat2 = nomi.query_postal_code("m4y").latitude
-    lon2 = nomi.query_postal_code("m4y").longitude
-    radius = 6371 # km
-    dlat = math.radians(lat2-lat1)
-    dlon = math.radians(lon2-lon1)
-    a = math.sin(dlat/2) * math.sin(dlat/2) + math.cos(math.radians(lat1)) \
-        * math.cos(math.radians(lat2)) * math.sin(dlon/2) * math.sin(dlon/2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    d = radius * c
-    minutes = (d/30) * 60 #assume 30 kmph
-    return round(minutes + 10) # for buffer
+# Loads everything that is otherwise loaded on first use, for servers that
+# would rather pay for it before the first customer arrives. With geocoder,
+# also builds the FSA table if it is missing, which needs the network.
+def warmup(geocoder=True):
+    sentiment.analyzer()
+    correction_index(tuple(BTBot.all_important_words))
+    compile_intents(handled(ORDER_COMMANDS))
+    current_menu().resolver
+    if geocoder:
+        from geo import default_geocoder, ensure_fsa_index
+        from stores import default_registry
+        ensure_fsa_index()
+        default_geocoder()
+        default_registry()
+
+# frozenset of Str, frozenset of Str -> frozenset of Str
+@lru_cache(maxsize=8)
+def menu_keywords(keywords, menu_words):
+    return keywords | menu_words
+
+# Str -> Str
+# the "toppings" or "drinks" menu as a table
+def menu_text(which_menu):
+    return current_menu().text.get(which_menu, "")
 
 def menu_printer(which_menu):
-    
-    if which_menu == 'toppings':
-        print("------------------------------------------------------")
-        print("|Toppings                                    |Price  |")
-        print("------------------------------------------------------")
-        for key, value in toppings_menu.items():
-            if key == "no": continue
-            print(f"|{key}",' '*(42 -len(key)),f"|${value}",
-                  ' '*(4 - len(str(value))),"|")
-            
-    if which_menu == "drinks":
-        print("------------------------------------------------------")
-        print("|Drinks (+$1.00 for Large, +$0.5 for Medium) |Price  |")
-        print("------------------------------------------------------")
-        for key, value in drinks_menu.items():
-            if key == todays_special:
-                key = key + f" ({day_of_the_week_name}'s Special)"
-            print(f"|{key}",' '*(42 -len(key)),f"|${value}",
-                  ' '*(4 - len(str(value))),"|")
+    print(menu_text(which_menu))
 
 class Drink:
-    # Str, listof Str, Int, Int, Int
-    def __init__(self, name=None, toppings=["nothing"], size=None, 
+    __slots__ = ("name", "toppings", "size", "sugar", "ice")
+
+    # Str, listof Str, Int, Int, Int; a drink without toppings gets its own
+    # ["nothing"]
+    def __init__(self, name=None, toppings=None, size=None, 
                  sugar=None, ice=None):
         if toppings is None:
-            toppings = []
-        self.toppings = toppings
+            toppings = ["nothing"]
         self.name = name
         self.toppings = toppings
         self.size = size
         self.sugar = sugar
         self.ice = ice
     
+    # MenuSnapshot -> Int, the exact cost in cents
+    def total_cents(self, menu=None):
+        return (menu or current_menu()).prices.drink_cents_of(self)
+
     def total_cost(self):
-        cost_of_toppings = 0
-        for toppings in self.toppings:
-            if toppings == 'nothing': break
-            cost_of_toppings += toppings_menu[toppings]
-        total_cost = (drinks_menu[self.name] + 
-                      size_menu[self.size] +
-                      cost_of_toppings)
-        return total_cost
+        return self.total_cents() / 100
     
     # used to inform the user of their drink
-    def print_drink(self):
+    def describe(self):
         toppings_as_string = ", ".join(self.toppings)
-        print(f"""
+        return f"""
         A {self.size} {self.name} with
-        {self.sugar} sugar, {self.ice} ice, with {toppings_as_string} as toppings.""")
+        {self.sugar} sugar, {self.ice} ice, with {toppings_as_string} as toppings."""
+
+    def print_drink(self):
+        print(self.describe())
+
+    # listof Str, the parts of the drink the customer has not given yet
+    def missing_slots(self):
+        missing = []
+        if self.name is None: missing.append("name")
+        if not self.size: missing.append("size")
+        if self.toppings == ["nothing"]: missing.append("toppings")
+        if self.ice in (-1, None): missing.append("ice")
+        if self.sugar in (-1, None): missing.append("sugar")
+        return missing
+
+    def template(self):
+        return DrinkTemplate(self.name, tuple(self.toppings), self.size,
+                             self.sugar, self.ice)
+
+    # DrinkTemplate -> Drink, a new drink to fill in
+    @classmethod
+    def from_template(cls, template):
+        return cls(template.name, list(template.toppings), template.size,
+                   template.sugar, template.ice)
+
+    # -> dictof Str: Any
+    # the drink as JSON-ready data, with None for what has not been given
+    def as_record(self):
+        return {"name": self.name, "size": self.size or None,
+                "toppings": list(self.toppings),
+                "sugar": None if self.sugar == -1 else self.sugar,
+                "ice": None if self.ice == -1 else self.ice}
     
 
+# Raised at the chat prompt when the customer has not answered within
+# BTBot.idle_timeout, so the session can be put away until they do
+class SessionIdle(Exception):
+    pass
+
+
 class BTBot:
+    # most bots sit idle waiting for a customer, so they are kept small
+    __slots__ = ("transport", "geocoder", "stores", "parse_cache", "order_log",
+                 "name", "order_items", "helped", "unable_to_communicate",
+                 "last_reference", "finished", "io_wait", "order_commands",
+                 "intents", "last_intent", "idle_timeout")
     finished_responses = ["done", "finished", "finish", "that's it", 
                           "thats it", "all", "that is all", "no more", "no"]
-    order_items = []
-    helped = False # if we help them already, the chat phrase will be different
     exit_commands = ["quit", "pause", "exit", "goodbye", "bye", "later"]
-    unable_to_communicate = 0 # 3 unables and the user is told to call
-    last_reference = todays_special
     menu_words = ["menu", "price", "choice", "choices"]
     keywords = ["strawberry", "pineapple", "explosion", "unicorn", "confetti",
                 "stormy", "pouf", "original", "milk", "tea", "sunshine", 
@@ -133,174 +170,254 @@ class BTBot:
                 "normal", "large", "small", "medium"]
     commands = ["want", "desire", "special", "order", "recommend", "price", 'and']
     all_important_words = keywords + commands
+    keyword_set = frozenset(keywords)
+    important_word_set = frozenset(all_important_words)
+
+    # today's MenuSnapshot
+    @property
+    def menu(self):
+        return current_menu()
+
+    # PhraseIndex over today's drinks and toppings
+    @property
+    def menu_index(self):
+        return current_menu().index
 
-    def __init__(self):
-        self.order_commands = {
-            'special_order':[r'.*order.*special.*'],
-            r'price_inquiry':[r'.*much.*that', r'.*much.*this'],
-            r'suggested_order':[r'.*want.*that', r'.*sounds\sgood.*',
-                                r'.*get.*that.*', r'.*get.*special.*', 
-                                r'.*order.*special.*', r'order.*that.*'],
-            r'describe_specials': [r'.*special.*', r'.*\recommend.*'],  
-            r'menu_inquiry':[r'.*menu.*', r'.*choice.*', r'.*option.*'],
-            r'single_order': [r'.*want.*', r'.*order.*',r'.*get.*'],
-            r'checkout': [r'.*checkout.*', r'.*done.*', r'.*bill.*',
-                          r'all.*', r'.*no.*']}
+    # Every conversation has its own BTBot, talking to the customer through
+    # transport (the terminal by default). geocoder replaces the default
+    # geo.Geocoder for delivery times, and stores the stores.StoreRegistry
+    # of locations delivering. Confirmed orders are appended to order_log (an
+    # orderlog.OrderLog) when one is given. Utterances are parsed through
+    # parse_cache (a parsecache.ParseCache), shared by all bots by default.
+    def __init__(self, transport=None, geocoder=None, order_log=None,
+                 stores=None, parse_cache=None):
+        self.transport = transport or StdioTransport()
+        self.geocoder = geocoder
+        self.stores = stores
+        self.parse_cache = parse_cache or shared_cache
+        self.order_log = order_log
+        self.name = None
+        self.order_items = []
+        self.helped = False # if we help them already, the chat phrase will be different
+        self.unable_to_communicate = 0 # 3 unables and the user is told to call
+        self.last_reference = current_menu().special
+        self.finished = False # set once the order has been placed
+        self.io_wait = 0.0 # seconds spent in the transport, for metrics
+        self.order_commands = ORDER_COMMANDS
+        self.intents = compile_intents(handled(self.order_commands))
+        self.last_intent = None
+        self.idle_timeout = None # seconds at the chat prompt before SessionIdle
     
     # Cleans up strings by removing unncessary words, autocorrects 
     # Str -> Str
+    @metrics.timed("reply_cleaner")
     def reply_cleaner(self, text):
-        text_lowered = text.lower()
-        tokenizer = RegexpTokenizer(r'\w+')
-        tokenized_text = tokenizer.tokenize(text)
-        for word in tokenized_text:
-            for correctly_spelt_word in self.all_important_words:
-                if word == 'no': continue # too easy to autocorrect incorrectly
-                elif edit_distance(word, correctly_spelt_word) == 1:
-                    word_index = tokenized_text.index(word)
-                    tokenized_text[word_index] = correctly_spelt_word
-        cleaned_string = " ".join(tokenized_text)         
-        # print(f"I'm interpreting this as {cleaned_string}")
+        index = correction_index(tuple(self.all_important_words))
+        words = list(corrected(tokenize(text), index))
+        cleaned_string = CleanedText(resolved(words, self.menu.resolver,
+                                              self.important_word_set))
         return cleaned_string
     
-    # Str -> listof Tokens or Str
+    # Str -> Parse
+    # what the customer said, cleaned up, with its intent and, for an order,
+    # the drinks it names; cached, as it depends only on the text and menu
+    @metrics.timed("understand")
+    def understand(self, text):
+        return self.parse_cache.get(text, self.menu.version, self.parse)
+
+    # Str -> Parse, uncached
+    def parse(self, text):
+        corrected = self.reply_cleaner(text)
+        intent = self.intents.classify(corrected)
+        drinks = ()
+        if intent == 'single_order':
+            drinks = tuple(drink.template() for drink in
+                           self.words_to_drink(self.essential_words(corrected)))
+        # cached as a plain str, without the words CleanedText carries
+        return Parse(str(corrected), intent, drinks)
+
+    # Str -> listof Str or Str
+    # the keywords in reply, reusing reply_cleaner's words when given its
+    # output; the words of today's drink and topping names are always keywords
+    @metrics.timed("essential_words")
     def essential_words(self, reply, form = "list"):
-        #!print(f"{reply} is being stripped to its essentials")
-        tokenized_reply = word_tokenize(reply)
-        essential_words = []
-        for word in tokenized_reply:
-            if word in self.keywords:
-                essential_words.append(word)        
+        essential_words = list(keywords_only(
+            words_of(reply), menu_keywords(self.keyword_set, self.menu.words)))
         if form == "string":
             return " ".join(essential_words)  
         else: # form == "list":
             return essential_words
                
                        
-    def exit(self, reply):
-        #!print("checking for exit statements")
+    # Str -> None
+    async def say(self, text):
+        if not metrics.registry.enabled:
+            return await self.transport.send(text)
+        start = time.perf_counter()
+        try:
+            await self.transport.send(text)
+        finally:
+            self.io_wait += time.perf_counter() - start
+
+    # Str -> Str
+    async def ask(self, prompt):
+        if not metrics.registry.enabled:
+            return await self.transport.ask(prompt or "")
+        start = time.perf_counter()
+        try:
+            return await self.transport.ask(prompt or "")
+        finally:
+            self.io_wait += time.perf_counter() - start
+
+    # -> Str
+    async def receive(self):
+        if not metrics.registry.enabled:
+            return await self.transport.receive()
+        start = time.perf_counter()
+        try:
+            return await self.transport.receive()
+        finally:
+            self.io_wait += time.perf_counter() - start
+
+    # Str, Bool -> Str
+    # asks at the chat prompt, where the conversation is at rest between
+    # requests. If the customer takes longer than idle_timeout to answer,
+    # raises SessionIdle; asking again with sent=True then waits for the
+    # answer without repeating the prompt.
+    async def ask_at_rest(self, prompt, sent=False):
+        if self.idle_timeout is None:
+            return await self.receive() if sent else await self.ask(prompt)
+        if not sent:
+            await self.say(prompt or "")
+        try:
+            return await asyncio.wait_for(self.receive(), self.idle_timeout)
+        except asyncio.TimeoutError:
+            raise SessionIdle() from None
+
+    # -> dictof Str: Any
+    # everything the conversation has to remember while at rest, with the
+    # order packed into bytes (see sessionstore.pack_drinks)
+    def state(self):
+        return {"name": self.name,
+                "order": pack_drinks(self.order_items, self.menu.prices),
+                "helped": self.helped,
+                "unable_to_communicate": self.unable_to_communicate,
+                "last_reference": self.last_reference,
+                "finished": self.finished, "last_intent": self.last_intent}
+
+    # dictof Str: Any -> None
+    # picks up a conversation from state()
+    def restore(self, state):
+        state = dict(state)
+        self.order_items = [Drink.from_template(template) for template in
+                            unpack_drinks(state.pop("order"), self.menu.prices)]
+        for attribute, value in state.items():
+            setattr(self, attribute, value)
+
+    async def exit(self, reply):
         for command in self.exit_commands:
             if command in reply:
-                reply = input("Have a nice day!")
+                await self.say("Have a nice day!")
                 return True
 
         
-    def greet(self):
-        self.name = input("""
+    async def greet(self):
+        self.name = await self.ask("""
         Hi! I'm Hamilton. I work for Abi's Bubble Tea House!
         I'll help you with your order today. You can talk to me to place 
         your order, or ask about today's special! What's your name? 
         """)
-        self.chat()
+        await self.chat()
         
-    def chat(self):
-        #!print("I am back in the chat method")
-        request = self.reply_cleaner((input(f"What can I do for you {self.name}?\n")))
-        while self.exit(request) != True:
-            #self.exit(request)
-            #!print(f"request is {request}1")
-            request = self.reply_cleaner(input(self.match_reply(request)))
-            #!print(f"request is {request}2")
-            #!print("I am back in the chat method2")
+    # resumed: the chat prompt has already been sent, e.g. to a session
+    # restored after SessionIdle
+    async def chat(self, resumed=False):
+        request = self.understand(await self.ask_at_rest(
+            f"What can I do for you {self.name}?\n", sent=resumed))
+        while await self.exit(request.corrected) != True:
+            prompt = await self.match_reply(request.corrected, request)
+            if self.finished: break
+            request = self.understand(await self.ask_at_rest(prompt))
             
         
-    def match_reply(self, reply):
-        #!print(f"reply is {reply}")
-        for intent, phrasing in self.order_commands.items():
-            for regex_pattern in phrasing:
-                #!print(f"searching {regex_pattern} in {intent}")
-                found_match = re.match(regex_pattern, reply)
-                if found_match:
-                    if intent == 'describe_specials':
-                        produced = self.describe_special_intent()
-                        #!print(f"{produced} is in match_reply")
-                        return produced
-                    elif intent == 'menu_inquiry':
-                        menu_printer("drinks")
-                        menu_printer("toppings")
-                        print("There you go! I've pointed out the special too!")
-                        return
-                    elif intent == 'suggested_order' or intent == 'single_order':
-                        if intent == 'suggested_order':
-                            suggested = "order" + self.last_reference + reply
-                            self.single_order_intent(suggested)
-                        else:
-                            self.single_order_intent(reply)
-                        print("I am printing out the drinks you've ordered")
-                        for drink in self.order_items:
-                            drink.print_drink()
-                        print("Would you like to add anything else "
-                                      "or go to the checkout?")
-                        return
-                    elif intent == 'price_inquiry':
-                        return self.price_inquiry_intent()
-
-                    elif intent == 'checkout' and self.order_items != []:
-                        return self.checkout_intent()
+    # reply: the cleaned-up text; parsed: its Parse, if already understood
+    @metrics.timed("match_reply", tag_attr="last_intent")
+    async def match_reply(self, reply, parsed=None):
+        if parsed is None:
+            parsed = self.parse(reply)
+        intent = parsed.intent
+        self.last_intent = intent
+        if intent == 'describe_specials':
+            produced = await self.describe_special_intent()
+            return produced
+        elif intent == 'menu_inquiry':
+            await self.say(self.menu.full_text)
+            await self.say("There you go! I've pointed out the special too!")
+            return
+        elif intent in ('suggested_order', 'single_order'):
+            if intent == 'suggested_order':
+                suggested = "order" + self.last_reference + reply
+                await self.single_order_intent(suggested)
+            else:
+                await self.single_order_intent(reply, parsed.drinks)
+            await self.say("I am printing out the drinks you've ordered")
+            for drink in self.order_items:
+                await self.say(drink.describe())
+            await self.say("Would you like to add anything else "
+                           "or go to the checkout?")
+            return
+        elif intent == 'price_inquiry':
+            return await self.price_inquiry_intent()
+
+        elif intent == 'checkout' and self.order_items != []:
+            return await self.checkout_intent()
         # occurs if nothing has been found            
         return self.no_match_intent()
     
     # produces True or False, depending on if a new drink should be produced.
     # A new drink is signified by overlapping descriptors that do not occur in 
     # "toppings".
-    def new_drink(self, descriptor, currentDrink, drink_lastword):  
+    def new_drink(self, full_drink_name, currentDrink, drink_lastword):  
         
-        if descriptor in drink_strings:
-            full_drink_name = None
-            for key in drinks_menu.keys():
-                if descriptor in key:
-                    full_drink_name = key
-                    break
         # if drinks have different names, then they are different
         if full_drink_name != currentDrink.name : 
             return True
         
-        elif (descriptor in ["large", "medium", "small"] 
+        elif (full_drink_name in ["large", "medium", "small"] 
               and currentDrink.size != None):
             return True
     
-    # produces a list of Drink(s) based on given words
+    # produces a list of Drink(s) based on given words; does not add them to
+    # the order
+    @metrics.timed("words_to_drink")
     def words_to_drink(self, important_words):
-        #!print("words_to_drink is running")
         name, toppings, size, sugar, ice = None, ["nothing"], None, -1, -1
         produced_drinks, drink_lastword, toppings_lastword = [], None, None
         last_word_and = None
         adjective = None
         drinks_started = 0
-        for descriptor in important_words:
-            #!print(f"Currently analyzing word: {descriptor}")
+        # a drink or topping named in several words is a single match
+        for match in self.menu_index.scan(important_words):
+            descriptor, item = match.word, match.item
             drink_so_far = Drink(name, toppings, size, sugar, ice)
-            if descriptor in drink_strings:
+            if item and item.kind == "drink":
                 # this signifies the end of the current drink, and the start
                 # of a new drink. 
-                if drinks_started !=0 and self.new_drink(descriptor, drink_so_far, drink_lastword) and last_word_and == False:
-                    #!print("This is the end of the current drink, starting new")
+                if drinks_started !=0 and self.new_drink(item.name, drink_so_far, drink_lastword) and last_word_and == False:
                     produced_drinks.append(drink_so_far)
                     drink_lastword = True
                     name, toppings, size, sugar, ice = None, ["nothing"], None, -1, -1
                     drinks_started += 1
                     
                 if drinks_started == 0: drinks_started += 1 
-                # finding the "full name" of the descriptor
-                for key in drinks_menu.keys():
-                    #!print("This is running")
-                    if descriptor in key:
-                        name = key
-                        break
-                #!print(f"The name is {name}")
+                name = item.name
                 drink_lastword = True
                 last_word_and = False
                 
-            elif descriptor in toppings_strings:
+            elif item and item.kind == "topping":
                 last_word_and = False
-                #!print(f"{descriptor} is a topping")
-                current_topping = None
+                current_topping = item.name
                 drink_lastword = False
-                # finding full name of toppings:
-                for key in toppings_menu.keys():
-                    if descriptor in key:
-                        current_topping = key
-                        break
                 if toppings == ["nothing"]:
                     toppings[0] = current_topping  
                 else:
@@ -310,32 +427,27 @@ class BTBot:
                     
             elif descriptor in ["less", "normal", "more"]:
                 last_word_and = False
-                #!print(f"{descriptor} is a adj")
                 drink_lastword = False
                 adjective = descriptor
                 
             elif descriptor == 'ice':
                 last_word_and = False
-                #!print(f"{descriptor} is a ice")
                 drink_lastword = False
                 ice = adjective
                 adjective = None
                 
             elif descriptor == 'sugar':
                 last_word_and = False
-                #!print(f"{descriptor} is a sugar")
                 drink_lastword = False
                 sugar = adjective
                 adjective = None
                 
             elif descriptor in ["large", "medium", "small"]:
                 if last_word_and == True:
-                    #!print("This is the end of the current drink, starting new")
                     produced_drinks.append(drink_so_far)
                     drink_lastword = True
                     name, toppings, size, sugar, ice = None, ["nothing"], None, -1, -1
                     drinks_started += 1                    
-                #!print(f"{descriptor} is a size")
                 size = descriptor
                 drink_lastword = False
                 
@@ -343,124 +455,67 @@ class BTBot:
             elif descriptor == "and":
                 last_word_and = True
                         
-        #!print(f"{drinks_started} drinks started")
-        #!print(f"{len(produced_drinks)} is how many drinks produced")        
         if drinks_started != len(produced_drinks):
-            #!print("I am producing extra drinks")
-            #!print(name, toppings, size, sugar, ice)
             finished_drink = Drink(name, toppings, size, sugar, ice)
             produced_drinks.append(finished_drink) 
-            #!print("I'm done producing extra drinks.")
-            #!print(f"{drinks_started} drinks started")
-            #!print(f"{len(produced_drinks)} is how many drinks produced")             
-         
-        for bubble_tea in produced_drinks:
-            self.order_items.append(bubble_tea)
-            bubble_tea.print_drink()
             
         return produced_drinks
     
 
-    def single_order_intent(self, reply):
-        #!print("this is a single_order_intent")
-        important_words = self.essential_words(reply, "list")
-        requested_drinks = self.words_to_drink(important_words)
-        #!print("finished_drinks have been receive, returning..")
-        return self.finish_off_drinks(requested_drinks)
+    # Str -> listof Drink
+    # the drinks a free-text order asks for, as single_order_intent would
+    # parse them, without asking about missing parts or adding to the order
+    def parse_order(self, text):
+        reply = self.reply_cleaner(text)
+        return self.words_to_drink(self.essential_words(reply))
+
+    # templates: the drinks reply names, if already parsed
+    async def single_order_intent(self, reply, templates=None):
+        if templates is None:
+            requested_drinks = self.words_to_drink(self.essential_words(reply))
+        else:
+            requested_drinks = [Drink.from_template(template)
+                                for template in templates]
+        for bubble_tea in requested_drinks:
+            self.order_items.append(bubble_tea)
+            await self.say(bubble_tea.describe())
+        return await self.finish_off_drinks(requested_drinks)
         #for word in important_words:
         
-    # loops until a valid response is received from the user
-    # drink_part can be anyof "size", "ice", "sugar", "toppings"
-    # returns a string, corresponding to a valid menu item (in exact wording)
-    def finish_off_drink_mechanic(self, drink_part, drink):   
-        correct_answer = False
-        repeated = False
-        
-        if drink_part == "toppings":
-            toppings = ["nothing"]
-            want = input("Do you want any toppings? ")
-            if "no" in self.reply_cleaner(want): return ["nothing"]
-            while correct_answer == False:
-                if repeated == True:
-                    print("""Sorry, that's not a response I was looking for.
-                    If you're unsure, feel free to ask for a menu!\n""")
-                response = self.essential_words(self.reply_cleaner(input (f"""
-                What toppings would you want in {drink.name}?\n""")))
-                if any(x in response for x in self.menu_words):
-                    menu_printer("toppings")
-                    response = self.essential_words(self.reply_cleaner(input("\n")))
-                    
-                current_topping = None
-                drink_lastword = False
-                toppings_lastword = None
-                # finding full name of toppings:
-                for word in response:
-                    for key in toppings_menu.keys():
-                        if word in key:
-                            current_topping = key
-                            correct_answer = True
-                            break   
-                    if toppings == ["nothing"]:
-                        toppings[0] = current_topping  
-                    else:
-                        if current_topping != toppings_lastword:
-                            toppings.append(current_topping)
-                    toppings_lastword = current_topping
-                
-                repeated = True
-            return toppings
-        
-        if drink_part == "ice" or drink_part == "sugar" or drink_part == "size":
-                while correct_answer == False:
-                    if repeated == True:
-                        print("Sorry, I didn't quite get that.\n")
-                    if drink_part == "size":
-                        response = self.reply_cleaner(input (f"""
-                        What size would you want {drink.name} to be? You can 
-                        pick between small, medium, or large.\n"""))
-                        correct_answer = next((x for x in ['small', 'medium', 'large'] 
-                                               if x in response ), False)  
-                    else:
-                        response = self.reply_cleaner(input (f"""
-                        How much {drink_part} would you want {drink.name} to have? 
-                        You can pick between less, normal, or more {drink_part}.\n"""))
-                        correct_answer = next((x for x in ['less', 'normal', 'more'] 
-                                           if x in response ), False)
-                    repeated = True
-                return correct_answer
-
-    def finish_off_drinks(self, listofDrinks):
+    # asks for everything the drinks are still missing, all drinks at once,
+    # until nothing is missing
+    @metrics.timed("finish_off_drinks")
+    async def finish_off_drinks(self, listofDrinks):
+        filler = SlotFiller(listofDrinks, self.menu)
+        while not filler.complete():
+            answer = self.reply_cleaner(await self.ask(filler.prompt()))
+            words = answer.split()
+            if any(word in words for word in self.menu_words):
+                if "name" in filler.missing():
+                    await self.say(self.menu.full_text)
+                else:
+                    await self.say(self.menu.text["toppings"])
+                continue
+            if not filler.fill(words):
+                await self.say("Sorry, I didn't quite get that. If you're "
+                               "unsure, feel free to ask for a menu!\n")
         for drink in listofDrinks:
-            if drink.size == None:
-                drink.size = self.finish_off_drink_mechanic("size", drink)
-                print(f"Gotcha, a {drink.size} {drink.name} ")
-                
-            if drink.toppings == ["nothing"]:
-                drink.toppings = self.finish_off_drink_mechanic("toppings", drink)
-                toppings_as_string = ", ".join(drink.toppings)
-                print(f"A {drink.size} {drink.name} with {toppings_as_string} "
-                      "as toppings, great!")
-            
-            if drink.ice == -1:
-                drink.ice = self.finish_off_drink_mechanic("ice", drink)
-                print(f"Fine choice {self.name}! ")
-            
-            if drink.sugar == -1:
-                drink.sugar = self.finish_off_drink_mechanic("ice", drink)
-                print("Delicious! ")
-        #!print("returning listofDrinks")        
+            toppings_as_string = ", ".join(drink.toppings)
+            await self.say(f"Gotcha, a {drink.size} {drink.name} with "
+                           f"{toppings_as_string} as toppings, {drink.ice} ice "
+                           f"and {drink.sugar} sugar. Delicious!")
         return listofDrinks
  
-    def describe_special_intent(self):
-        print(f"Today's special is the {todays_special}! It is $1.5 "
-                      "off its original price!\n")
-        self.last_reference = todays_special
+    async def describe_special_intent(self):
+        special = self.menu.special
+        await self.say(f"Today's special is the {special}! It is "
+                       f"${SPECIAL_DISCOUNT} off its original price!\n")
+        self.last_reference = special
         #return self.reply_cleaner(reply)
 
-    def price_inquiry_intent(self):
-        #!print("this is a price_inquiry_intent")
+    async def price_inquiry_intent(self):
         reference = self.last_reference
-        reply = input(f"The {reference} is ${big_menu[reference]}. \n")
+        reply = await self.ask(f"The {reference} is ${self.menu.big_menu[reference]}. \n")
         return self.reply_cleaner(reply)
     
     
@@ -478,39 +533,65 @@ class BTBot:
                         "Can you type that out again? I don't understand. ")
             return random.choice(responses)
         
-    def checkout_intent(self):
-        price = 0
-        for drink in self.order_items:
-            price += drink.total_cost()
-        total_cost = round(price * 1.13, 2)
-        postal_code_reply = (input(f"""
-        Your total is ${round(price, 2)}. We'll deliver it to your door,
-        at a cost of $2. Plus tax, the total is {total_cost+2}.
-        You can pay at the door. Input your postal code:\n""")).lower()
-        #!print(postal_code_reply)
-        postal_code = re.findall(r'[a-z]\d[a-z]', postal_code_reply)[0]
-        print(f"Confirmed! Your drink will take around {distance(postal_code)} "
-              "minutes to get there from our Toronto Yonge Street location! "
-              f"Thanks {self.name} for ordering with us!")
-        self.comments()
-        print(f"Bye {self.name}, I hope to see you again!")
-        quit()
+    async def checkout_intent(self):
+        menu = self.menu
+        price = sum(drink.total_cents(menu) for drink in self.order_items)
+        total_cost = pricing.order_total(price)
+        prompt = f"""
+        Your total is ${pricing.dollars(price)}. We'll deliver it to your door,
+        at a cost of $2. Plus tax, the total is {pricing.dollars(total_cost)}.
+        You can pay at the door. Input your postal code:\n"""
+        # asked again until it is a postal code we can deliver to
+        while True:
+            postal_code_reply = (await self.ask(prompt)).lower()
+            postal_codes = re.findall(r'[a-z]\d[a-z]', postal_code_reply)
+            if postal_codes:
+                postal_code = postal_codes[0]
+                try:
+                    store, eta = delivery(postal_code, self.geocoder,
+                                          self.stores)
+                    break
+                except ValueError: # not a postal code we know
+                    pass
+            prompt = ("Sorry, I couldn't find that postal code. Could you "
+                      "type it again? (like M5V 2T6)\n")
+        await self.say(f"Confirmed! Your drink will take around {eta} "
+                       f"minutes to get there from our {store.name} location! "
+                       f"Thanks {self.name} for ordering with us!")
+        # logged before the optional feedback, which the customer may not
+        # stay for
+        order = None
+        if self.order_log is not None:
+            order = orderlog.order_record(
+                self.order_items, price, total_cost, postal_code.upper(), eta,
+                None, menu, store=store.name)
+            self.order_log.append(order)
+        feeling = await self.comments()
+        if order is not None and feeling is not None:
+            self.order_log.append(orderlog.feedback_record(order, feeling))
+        await self.say(f"Bye {self.name}, I hope to see you again!")
+        self.finished = True
               
-    def comments(self):
-        reply = input("Do you want to give me feedback on how I did? ")
-        analyzer = SentimentIntensityAnalyzer()
-        score = analyzer.polarity_scores(reply)
+    # -> Float or None, the compound sentiment of the customer's feedback, or
+    # None if they declined to give any
+    @metrics.timed("comments")
+    async def comments(self):
+        reply = await self.ask("Do you want to give me feedback on how I did? ")
+        score = sentiment.polarity_scores(reply)
         if score['neg'] == 0:
-            feedback = input("Great! Go ahead!\n")
-            feedback_score = analyzer.polarity_scores(feedback)
+            feedback = await self.ask("Great! Go ahead!\n")
+            feedback_score = sentiment.polarity_scores(feedback)
             if feedback_score['pos'] >= 0:
-                print("That's so nice! Thanks for your feedback!")
+                await self.say("That's so nice! Thanks for your feedback!")
             else:
-                print("We're always trying to improve Hamilton, thanks for your "
-                      "invaluable feedback that will make Hamilton better!") 
-        else:
-            print("Alright, thanks again for your order!")
-        return
+                await self.say("We're always trying to improve Hamilton, thanks for your "
+                               "invaluable feedback that will make Hamilton better!") 
+            return feedback_score['compound']
+        await self.say("Alright, thanks again for your order!")
+        return None
     
-bot = BTBot()
-bot.greet()
+def main():
+    asyncio.run(BTBot().greet())
+
+if __name__ == "__main__":
+    main()
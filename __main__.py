@@ -0,0 +1,4 @@
+# python <path to this directory>: chat with Hamilton in the terminal
+from BubbleTeaChatboy import main
+
+main()
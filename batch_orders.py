@@ -0,0 +1,131 @@
+import argparse
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+
+from BubbleTeaChatboy import BTBot
+from chunked import map_chunks
+
+# Turns archives of free-text orders (SMS, web forms, ...) into structured
+# drinks with the same parser the chat uses, without asking the customer
+# anything: whatever an order leaves out is reported as missing slots.
+# Input is JSONL, one order per line, either a JSON string or an object with
+# the text under "text" (and optionally an "id"). Output is JSONL:
+#   {"id": ..., "drinks": [{"name": ..., "size": ..., "toppings": [...],
+#                           "sugar": ..., "ice": ..., "missing": [...]}],
+#    "missing": Int}
+# with null for whatever the order left out. A line that cannot be parsed
+# gives {"id": ... or null, "error": Str} in its place, and the run goes on.
+
+_bot = None # each worker process parses with its own BTBot
+
+def _worker_bot():
+    global _bot
+    if _bot is None:
+        _bot = BTBot()
+    return _bot
+
+
+# dictof Str: Any or Str -> dictof Str: Any
+def parse_record(record, field="text"):
+    if isinstance(record, str):
+        record = {field: record}
+    drinks = []
+    for drink in _worker_bot().parse_order(record.get(field, "")):
+        parsed = drink.as_record()
+        parsed["missing"] = drink.missing_slots()
+        drinks.append(parsed)
+    return {"id": record.get("id"), "drinks": drinks,
+            "missing": sum(len(drink["missing"]) for drink in drinks)}
+
+
+# Str, Str -> dictof Str: Any
+# the output record for one JSONL line, or an error record if the line is
+# not JSON or its order cannot be parsed
+def parse_line(line, field="text"):
+    record = None
+    try:
+        record = json.loads(line)
+        return parse_record(record, field)
+    except Exception as error:
+        order_id = record.get("id") if isinstance(record, dict) else None
+        return {"id": order_id, "error": f"{type(error).__name__}: {error}"}
+
+
+# listof Str, Str -> (listof Str, Int, Float)
+# parses a chunk of JSONL lines, returning output lines, this worker's pid
+# and the CPU seconds spent
+def parse_chunk(lines, field="text"):
+    start = time.process_time()
+    parsed = [json.dumps(parse_line(line, field)) for line in lines]
+    return parsed, os.getpid(), time.process_time() - start
+
+
+class BatchStats:
+    def __init__(self):
+        self.records = 0
+        self.cpu = {} # pid -> CPU seconds
+        self.handled = {} # pid -> records
+
+    def add(self, count, pid, cpu):
+        self.records += count
+        self.cpu[pid] = self.cpu.get(pid, 0.0) + cpu
+        self.handled[pid] = self.handled.get(pid, 0) + count
+
+    def report(self, elapsed, out=sys.stderr):
+        print(f"{self.records} orders in {elapsed:.2f}s "
+              f"({self.records / elapsed:,.0f} orders/sec, "
+              f"{len(self.cpu)} workers)", file=out)
+        for pid, cpu in sorted(self.cpu.items()):
+            rate = self.handled[pid] / cpu if cpu else float("inf")
+            print(f"  worker {pid}: {self.handled[pid]} orders, "
+                  f"{rate:,.0f} orders/CPU-sec", file=out)
+
+
+# iterable of Str -> iterable of Str
+# parses JSONL lines into output JSONL lines, in input order, in chunks of
+# chunk_size spread over processes worker processes if given (see chunked)
+def parse_orders(lines, processes=None, chunk_size=500, field="text",
+                 stats=None):
+    stats = stats or BatchStats()
+    lines = (line for line in lines if line.strip())
+    for parsed, pid, cpu in map_chunks(functools.partial(parse_chunk,
+                                                         field=field),
+                                       lines, chunk_size, processes):
+        stats.add(len(parsed), pid, cpu)
+        yield from parsed
+
+
+# Str, file -> context manager of file; "-" means the given standard stream
+def _open(path, standard, mode="r"):
+    if path == "-":
+        return contextlib.nullcontext(standard)
+    return open(path, mode)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Parse free-text orders (JSONL) into structured drinks.")
+    parser.add_argument("input", help="JSONL file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-",
+                        help="JSONL file to write, or - for stdout")
+    parser.add_argument("--field", default="text",
+                        help="record field holding the order text")
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+    stats = BatchStats()
+    start = time.perf_counter()
+    with _open(args.input, sys.stdin) as source, \
+         _open(args.output, sys.stdout, "w") as target:
+        for line in parse_orders(source, args.processes, args.chunk_size,
+                                 args.field, stats):
+            target.write(line + "\n")
+    stats.report(time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
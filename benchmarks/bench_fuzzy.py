@@ -0,0 +1,134 @@
+# Benchmark: resolving misspelled menu words with FuzzyResolver's trigram
+# matrix vs. scoring every vocabulary word in a Python loop, on synthetic
+# menus of growing size. Each utterance has a few words misspelled by two
+# edits among words that are not on the menu. Then words that look like
+# words of the real menu are resolved against it: ordinary words ("store",
+# "origin"), which should be left alone, and variants and misspellings of
+# menu words, which should not. Run from the repository root:
+#   python benchmarks/bench_fuzzy.py --utterances 2000
+import argparse
+import math
+import os
+import random
+import string
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fuzzy import FuzzyResolver, edit_distance, trigrams
+
+FILLER = ["can", "i", "get", "please", "with", "and", "thanks", "want",
+          "some", "would", "like", "today"]
+LOOKALIKES = ["store", "stores", "origin", "origins", "storey", "stormed",
+              "strong", "sunshade", "explore", "confess", "pineal",
+              "jellyfish", "creamer", "uniform", "strawman"]
+VARIANTS = ["pearl", "beans", "yoghurt", "yogurts", "unicorns", "pineapples",
+            "tapioka", "tapiokka", "strawbery", "strawbry", "explosn",
+            "confeti", "sunshin", "whiped", "grasss"]
+CONSONANTS = "bcdfghjklmnprstvwz"
+VOWELS = "aeiou"
+
+
+def synthetic_words(rng, count):
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(CONSONANTS) + rng.choice(VOWELS)
+                          for _ in range(rng.randint(2, 5))))
+    return sorted(words)
+
+
+# Str -> Str with two random insertions, deletions or substitutions
+def misspelled(rng, word):
+    for _ in range(2):
+        i = rng.randrange(len(word))
+        edit = rng.choice("ids")
+        letter = rng.choice(string.ascii_lowercase)
+        if edit == "i":
+            word = word[:i] + letter + word[i:]
+        elif edit == "d" and len(word) > 4:
+            word = word[:i] + word[i + 1:]
+        else:
+            word = word[:i] + letter + word[i + 1:]
+    return word
+
+
+# the same scores, one vocabulary word at a time
+def loop_resolve(resolver, words):
+    vocabulary = [(word, Counter(trigrams(word))) for word in resolver.vocabulary]
+    resolved = []
+    for word in words:
+        if not resolver.candidate(word):
+            resolved.append(None)
+            continue
+        counts = Counter(trigrams(word))
+        norm = math.sqrt(sum(c * c for c in counts.values()))
+        limit = resolver.edits_allowed(word)
+        # the matrix is float32, so scores landing exactly on the threshold
+        # may come out just either side of it
+        best, best_score = None, resolver.threshold - 1e-6
+        for candidate, candidate_counts in vocabulary:
+            ratio = min(len(word), len(candidate)) / max(len(word), len(candidate))
+            if ratio < resolver.length_ratio:
+                continue
+            if edit_distance(word, candidate, limit) > limit:
+                continue
+            score = (sum(count * candidate_counts[trigram]
+                         for trigram, count in counts.items())
+                     / norm / math.sqrt(sum(c * c for c in candidate_counts.values())))
+            if score > best_score + 1e-6 or (best is None and score >= best_score):
+                best, best_score = candidate, score
+        resolved.append(best)
+    return resolved
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--utterances", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    for size in (20, 200, 1000):
+        vocabulary = synthetic_words(rng, size)
+        resolver = FuzzyResolver(vocabulary)
+        resolver.cache_size = 0 # every utterance is resolved afresh
+        utterances, intended = [], []
+        for _ in range(args.utterances):
+            meant = rng.sample(vocabulary, 3)
+            utterances.append(rng.sample(FILLER, 5)
+                              + [misspelled(rng, word) for word in meant])
+            intended.append([None] * 5 + meant)
+
+        start = time.perf_counter()
+        results = [resolver.resolve(words) for words in utterances]
+        vector_time = (time.perf_counter() - start) / len(utterances)
+
+        sample = utterances[:200]
+        start = time.perf_counter()
+        expected = [loop_resolve(resolver, words) for words in sample]
+        loop_time = (time.perf_counter() - start) / len(sample)
+        agree = sum(a == b for a, b in zip(results, expected)) / len(sample)
+
+        found = sum(got == meant for result, meant in zip(results, intended)
+                    for got, meant in zip(result[5:], meant[5:]))
+        false = sum(got is not None for result in results
+                    for got in result[:5])
+        print(f"{size:5} words: {vector_time * 1e6:8.1f} us/utterance "
+              f"({1 / vector_time:,.0f}/sec), Python loop "
+              f"{loop_time * 1e6:9.1f} us ({agree:.0%} same answers); "
+              f"{found / (3 * len(utterances)):.0%} of misspellings resolved, "
+              f"{false} filler words taken for menu words")
+
+    from menus import current_menu
+    resolver = current_menu().resolver
+    taken = [f"{word}->{found}" for word, found
+             in zip(LOOKALIKES, resolver.resolve(LOOKALIKES)) if found]
+    missed = [word for word, found
+              in zip(VARIANTS, resolver.resolve(VARIANTS)) if not found]
+    print(f"menu: {len(taken)} of {len(LOOKALIKES)} ordinary words taken for "
+          f"menu words ({', '.join(taken) or 'none'}); "
+          f"{len(VARIANTS) - len(missed)} of {len(VARIANTS)} variants "
+          f"resolved (missed: {', '.join(missed) or 'none'})")
+
+
+if __name__ == "__main__":
+    main()
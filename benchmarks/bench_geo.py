@@ -0,0 +1,50 @@
+# Benchmark: cached single ETAs and vectorized batch_eta. Uses the real FSA
+# table if it has been built (python geo.py build), otherwise a synthetic
+# table of the same size. Run from the repository root:
+#   python benchmarks/bench_geo.py
+import os
+import random
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import geo
+
+
+def synthetic_table(rng, size=1650):
+    coordinates = {"M4Y": (43.6656, -79.3830)}
+    letters = "ABCEGHJKLMNPRSTVXY"
+    while len(coordinates) < size:
+        code = f"{rng.choice(letters)}{rng.randrange(10)}{rng.choice(letters)}"
+        coordinates[code] = (rng.uniform(42, 60), rng.uniform(-140, -52))
+    return coordinates
+
+
+def main():
+    rng = random.Random(0)
+    if os.path.exists(geo.FSA_INDEX_PATH):
+        geocoder = geo.Geocoder.load()
+    else:
+        print("FSA table not built, using a synthetic table")
+        geocoder = geo.Geocoder.from_coordinates(synthetic_table(rng))
+    codes = [code.decode() for code in np.asarray(geocoder.codes)]
+    customers = [rng.choice(codes) for _ in range(10000)]
+
+    cold = timeit.timeit(lambda: geocoder._eta_minutes(customers[0]),
+                         number=1000) / 1000
+    warm = timeit.timeit(lambda: [geocoder.eta_minutes(c) for c in customers],
+                         number=5) / (5 * len(customers))
+    batch = timeit.timeit(lambda: geocoder.batch_eta(customers),
+                          number=5) / 5
+    assert list(geocoder.batch_eta(customers[:100])) == \
+        [geocoder.eta_minutes(c) for c in customers[:100]]
+    print(f"uncached eta_minutes:    {cold * 1e6:8.1f} us/code")
+    print(f"cached eta_minutes:      {warm * 1e6:8.1f} us/code")
+    print(f"batch_eta of {len(customers)}: {batch * 1e3:8.1f} ms "
+          f"({batch / len(customers) * 1e6:.2f} us/code)")
+
+
+if __name__ == "__main__":
+    main()
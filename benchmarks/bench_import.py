@@ -0,0 +1,61 @@
+# Import-time benchmark, measured in fresh interpreters with -X importtime.
+# Compares importing the core module (heavy dependencies deferred) with the
+# dependencies it used to import eagerly, and with an explicit warmup().
+# Run from the repository root:
+#   python benchmarks/bench_import.py
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ("import BubbleTeaChatboy (lazy)",
+     "import BubbleTeaChatboy"),
+    ("previously eager nltk/pgeocode/vader imports",
+     "import nltk.tokenize, nltk.metrics, pgeocode, "
+     "vaderSentiment.vaderSentiment"),
+    ("import BubbleTeaChatboy + warmup(geocoder=False)",
+     "import BubbleTeaChatboy; BubbleTeaChatboy.warmup(geocoder=False)"),
+]
+
+
+# Str -> (Int, Float)
+# total microseconds reported by -X importtime, and wall-clock seconds
+def measure(code):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        errors = [line for line in result.stderr.splitlines() if "Error" in line]
+        raise RuntimeError((errors or ["exit status %d" % result.returncode])[-1])
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "): # top-level imports only
+            total += int(cumulative_us)
+    return total, elapsed
+
+
+def main(repeat=5):
+    for label, code in CASES:
+        runs = []
+        for _ in range(repeat):
+            try:
+                runs.append(measure(code))
+            except RuntimeError as error:
+                print(f"{label}: failed ({error})")
+                break
+        else:
+            imports = min(total for total, _ in runs)
+            wall = min(elapsed for _, elapsed in runs)
+            print(f"{label:50} imports {imports / 1e3:7.1f} ms, "
+                  f"process {wall * 1e3:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Benchmark: compiled IntentClassifier vs. the original per-pattern re.match
+# loop in BTBot.match_reply. Run from the repository root:
+#   python benchmarks/bench_intents.py
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from intents import ORDER_COMMANDS, UNHANDLED, compile_intents, handled
+
+# cleaned customer utterances, as reply_cleaner hands them to match_reply
+CORPUS = [
+    "menu", "what are the choices", "any options",
+    "what is the special", "what do you recommend",
+    "how much is that", "how much is this one",
+    "how much to order that special",
+    "I want that", "sounds good", "can I get that", "order the special",
+    "I want a large original milk tea with tapioca pearls",
+    "can I get a small stormy pouf and a medium unicorn confetti",
+    "I d like to order a sunshine yogurt less ice normal sugar",
+    "checkout", "I am done", "bill please", "all good", "no thanks",
+    "hello there", "what time is it", "thanks so much for your help",
+    "I was wondering if you could tell me a little bit about the shop",
+]
+
+
+# Str -> Str or None
+# the original loop: every pattern is recompiled (via re's cache) and scanned
+# in turn until one of an intent match_reply handles matches
+def loop_classify(reply):
+    for intent, phrasing in ORDER_COMMANDS.items():
+        if intent in UNHANDLED:
+            continue
+        for regex_pattern in phrasing:
+            if re.match(regex_pattern, reply):
+                return intent
+    return None
+
+
+def main():
+    classifier = compile_intents(handled(ORDER_COMMANDS))
+    for utterance in CORPUS:
+        expected = loop_classify(utterance)
+        actual = classifier.classify(utterance)
+        assert expected == actual, (utterance, expected, actual)
+        print(f"{str(actual):18} <- {utterance}")
+
+    number = 2000
+    old = timeit.timeit(lambda: [loop_classify(u) for u in CORPUS],
+                        number=number)
+    new = timeit.timeit(lambda: [classifier.classify(u) for u in CORPUS],
+                        number=number)
+    per_turn = number * len(CORPUS)
+    print()
+    print(f"re.match loop:       {old / per_turn * 1e6:7.2f} us/turn")
+    print(f"compiled classifier: {new / per_turn * 1e6:7.2f} us/turn")
+    print(f"speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
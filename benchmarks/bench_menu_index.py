@@ -0,0 +1,63 @@
+# Benchmark: PhraseIndex lookups vs. the old substring test plus linear scan
+# over the menu, on a synthetic menu with hundreds of drinks and toppings.
+# Run from the repository root:
+#   python benchmarks/bench_menu_index.py --items 500
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from menu_index import PhraseIndex
+
+WORDS = ["brown", "sugar", "matcha", "taro", "mango", "peach", "oolong",
+         "jasmine", "lychee", "honeydew", "coconut", "almond", "cheese",
+         "foam", "crystal", "boba", "pudding", "aloe", "coffee", "jelly",
+         "rose", "passion", "fruit", "green", "black", "milk", "tea", "smoothie"]
+
+
+# every name gets one word of its own, like "taro" or "stormy" on the real menu
+def synthetic_menu(rng, size, kind):
+    return [" ".join(rng.sample(WORDS, rng.randint(0, 3)) + [f"{kind}{i}"])
+            for i in range(size)]
+
+
+def old_lookup(word, drinks, toppings, drink_strings, toppings_strings):
+    if word in drink_strings:
+        for key in drinks:
+            if word in key:
+                return key
+    elif word in toppings_strings:
+        for key in toppings:
+            if word in key:
+                return key
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=500)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    drinks = synthetic_menu(rng, args.items, "drink")
+    toppings = synthetic_menu(rng, args.items // 2, "topping")
+    drink_strings, toppings_strings = " ".join(drinks), " ".join(toppings)
+    index = PhraseIndex({"drink": drinks, "topping": toppings})
+    vocabulary = [word for name in drinks + toppings for word in name.split()]
+    utterances = [[rng.choice(vocabulary) for _ in range(12)] for _ in range(200)]
+
+    number = 20
+    old = timeit.timeit(lambda: [old_lookup(w, drinks, toppings, drink_strings,
+                                            toppings_strings)
+                                 for words in utterances for w in words],
+                        number=number)
+    new = timeit.timeit(lambda: [list(index.scan(words)) for words in utterances],
+                        number=number)
+    per_turn = number * len(utterances)
+    print(f"{len(drinks)} drinks, {len(toppings)} toppings")
+    print(f"substring + linear scan: {old / per_turn * 1e6:8.1f} us/utterance")
+    print(f"PhraseIndex.scan:        {new / per_turn * 1e6:8.1f} us/utterance")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Benchmark: appending orders through OrderLog's group commits vs. one write
+# and fsync per order, then a daily report over the whole log through mmap.
+# Run from the repository root:
+#   python benchmarks/bench_orderlog.py --orders 1000000
+import argparse
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from menus import current_menu
+import orderlog
+
+
+def random_record(rng, menu, day):
+    drinks = [{"name": rng.choice(list(menu.drinks)),
+               "size": rng.choice(list(menu.sizes)),
+               "toppings": rng.sample(list(menu.toppings), rng.randint(0, 2))
+                           or ["nothing"],
+               "sugar": "normal", "ice": "normal",
+               "cents": rng.randrange(300, 800)}
+              for _ in range(rng.randint(1, 3))]
+    subtotal = sum(drink["cents"] for drink in drinks)
+    return {"date": day, "time": "12:00:00", "menu": day, "drinks": drinks,
+            "subtotal": subtotal, "total": subtotal, "fsa": "M5V", "eta": 18,
+            "sentiment": 0.5}
+
+
+# appends records from several threads at once, like concurrent checkouts
+def concurrent_appends(append, records, threads=8):
+    workers = [threading.Thread(target=lambda part=records[i::threads]:
+                                [append(record) for record in part])
+               for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=200000)
+    parser.add_argument("--synced", type=int, default=2000,
+                        help="orders to write with one fsync each")
+    args = parser.parse_args()
+    rng = random.Random(0)
+    menu = current_menu()
+    days = [(datetime.date(2026, 1, 1) + datetime.timedelta(d)).isoformat()
+            for d in range(30)]
+    with tempfile.TemporaryDirectory() as directory:
+        synced_path = os.path.join(directory, "synced.jsonl")
+        records = [random_record(rng, menu, days[0])
+                   for _ in range(args.synced)]
+        lock = threading.Lock()
+        with open(synced_path, "ab") as out:
+            def append(record):
+                with lock:
+                    out.write(json.dumps(record, separators=(",", ":")).encode()
+                              + b"\n")
+                    out.flush()
+                    os.fsync(out.fileno())
+            synced_time = concurrent_appends(append, records)
+        print(f"fsync per order: {args.synced / synced_time:12,.0f} orders/sec")
+
+        path = os.path.join(directory, "orders.jsonl")
+        log = orderlog.OrderLog(path)
+        records = [random_record(rng, menu, rng.choice(days))
+                   for _ in range(args.orders)]
+        start = time.perf_counter()
+        concurrent_appends(log.append, records)
+        log.flush()
+        grouped_time = time.perf_counter() - start
+        log.close()
+        print(f"group commits:   {args.orders / grouped_time:12,.0f} orders/sec "
+              f"({log.commits} fsyncs for {log.committed} orders)")
+        del records
+
+        size = os.path.getsize(path)
+        start = time.perf_counter()
+        reports = orderlog.daily_reports(orderlog.scan(path))
+        scan_time = time.perf_counter() - start
+        start = time.perf_counter()
+        one_day = orderlog.daily_reports(orderlog.scan(path, days[0]))
+        day_time = time.perf_counter() - start
+        print(f"report over {size / 2**20:.1f} MiB, {len(reports)} days: "
+              f"{scan_time:.2f}s ({args.orders / scan_time:,.0f} orders/sec)")
+        print(f"report for one day ({one_day[days[0]].orders} orders): "
+              f"{day_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
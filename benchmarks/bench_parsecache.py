@@ -0,0 +1,68 @@
+# Benchmark: understanding customer utterances through the shared ParseCache
+# vs. parsing every one from scratch, on traffic where a few phrasings make
+# up most of what customers say. Run from the repository root:
+#   python benchmarks/bench_parsecache.py --utterances 100000
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from BubbleTeaChatboy import BTBot
+from parsecache import ParseCache
+
+COMMON = [
+    "menu",
+    "what is the special",
+    "I want a large original milk tea with tapioca pearls",
+    "I want a medium stormy pouf with red bean less ice normal sugar",
+    "checkout",
+    "how much is that",
+]
+WORDS = ["large", "small", "medium", "unicorn", "confetti", "sunshine",
+         "yogurt", "grass", "jelly", "whipped", "cream", "less", "more",
+         "ice", "sugar", "please", "and", "with"]
+
+
+# a mix of common phrasings and one-off orders, common ones Zipf-weighted
+def traffic(rng, count, unique_share):
+    weights = [1 / (rank + 1) for rank in range(len(COMMON))]
+    said = []
+    for _ in range(count):
+        if rng.random() < unique_share:
+            said.append("I want " + " ".join(rng.choices(WORDS, k=8)))
+        else:
+            said.append(rng.choices(COMMON, weights)[0])
+    return said
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--utterances", type=int, default=50000)
+    parser.add_argument("--unique-share", type=float, default=0.1,
+                        help="fraction of utterances never seen before")
+    args = parser.parse_args()
+    said = traffic(random.Random(0), args.utterances, args.unique_share)
+    bot = BTBot(parse_cache=ParseCache())
+    bot.understand("warm up") # builds the correction index and intents
+
+    start = time.perf_counter()
+    uncached = [bot.parse(text) for text in said]
+    uncached_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cached = [bot.understand(text) for text in said]
+    cached_time = time.perf_counter() - start
+    assert [(p.corrected, p.intent, p.drinks) for p in uncached] == \
+           [(p.corrected, p.intent, p.drinks) for p in cached]
+
+    stats = bot.parse_cache.stats()
+    print(f"{args.utterances} utterances, {args.unique_share:.0%} never seen before")
+    print(f"parse every time: {uncached_time / args.utterances * 1e6:7.1f} us/utterance")
+    print(f"ParseCache:       {cached_time / args.utterances * 1e6:7.1f} us/utterance "
+          f"(hit rate {stats['hit_rate']:.1%}, {stats['evictions']} evictions)")
+
+
+if __name__ == "__main__":
+    main()
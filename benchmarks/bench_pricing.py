@@ -0,0 +1,71 @@
+# Benchmark: bulk re-pricing of historical orders with PriceTable.price_orders
+# vs. summing float menu prices drink by drink, as Drink.total_cost used to.
+# Run from the repository root:
+#   python benchmarks/bench_pricing.py --orders 200000
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from BubbleTeaChatboy import Drink, drinks_menu, size_menu, toppings_menu
+import pricing
+
+
+# listof Drink -> Float
+# the old checkout arithmetic
+def float_total(order):
+    price = 0
+    for drink in order:
+        cost_of_toppings = 0
+        for toppings in drink.toppings:
+            if toppings == 'nothing': break
+            cost_of_toppings += toppings_menu[toppings]
+        price += drinks_menu[drink.name] + size_menu[drink.size] + cost_of_toppings
+    return round(price * 1.13, 2) + 2
+
+
+def random_order(rng):
+    return [Drink(rng.choice(list(drinks_menu)),
+                  rng.sample(list(toppings_menu), rng.randint(0, 2)) or ["nothing"],
+                  rng.choice(list(size_menu)), "normal", "normal")
+            for _ in range(rng.randint(1, 4))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=100000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    orders = [random_order(rng) for _ in range(args.orders)]
+    table = pricing.price_table(drinks_menu, size_menu, toppings_menu)
+    encoded = [[table.encode(drink) for drink in order] for order in orders]
+
+    start = time.perf_counter()
+    floats = [float_total(order) for order in orders]
+    float_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns = pricing.OrderColumns(encoded)
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    subtotals = table.price_orders(columns)
+    totals = [pricing.order_total(subtotal) for subtotal in subtotals]
+    batch_time = time.perf_counter() - start
+    assert subtotals == [sum(map(table.line_cents, order)) for order in encoded]
+
+    drifted = sum(1 for f, c in zip(floats, totals) if round(f * 100) != c)
+    exact = sum(totals)
+    print(f"{args.orders} orders, {sum(map(len, orders))} drinks")
+    print(f"float loop:   {float_time:6.3f}s ({args.orders / float_time:,.0f} orders/sec), "
+          f"sum ${sum(floats):,.2f}")
+    print(f"loading into OrderColumns (once): {load_time:6.3f}s")
+    print(f"price_orders: {batch_time:6.3f}s ({args.orders / batch_time:,.0f} orders/sec), "
+          f"sum ${pricing.dollars(exact)}")
+    print(f"orders where float rounding differs from exact cents: {drifted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# Benchmark: memory held by N conversations sitting at the chat prompt with
+# a drink in their order, kept in memory against spilled to a SessionStore,
+# next to what the customers' transports take on their own. Spilling frees
+# the bot; the transport and the session's parked task stay for as long as
+# the customer is connected. Measured with tracemalloc, so it counts Python
+# allocations only. Run from the repository root:
+#   python benchmarks/bench_session_memory.py --customers 10000 100000
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sessions import SessionEngine
+from sessionstore import SessionStore
+from transports import MemoryTransport
+
+SCRIPT = [
+    "Bill",
+    "I want a large original milk tea with tapioca pearls less ice normal sugar",
+]
+
+
+# plays SCRIPT as one customer, leaving the conversation at the chat prompt
+async def customer(engine, customer_id):
+    transport = engine.open_memory_session(customer_id)
+    await transport.replies() # greeting
+    for text in SCRIPT:
+        await transport.turn(text)
+    return transport
+
+
+# Int -> Float
+# bytes per MemoryTransport, as the customers' connections cost regardless
+def transport_bytes(customers):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    transports = [MemoryTransport() for _ in range(customers)]
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return held / len(transports)
+
+
+async def run(customers, store, quiet=False):
+    engine = SessionEngine(store=store, idle_timeout=0.5)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    transports = await asyncio.gather(*(customer(engine, i)
+                                        for i in range(customers)))
+    if store is not None:
+        while engine.sessions:
+            await asyncio.sleep(0.1)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    label = "in memory" if store is None else "spilled"
+    if not quiet:
+        print(f"{label:>9}: {held / customers:8.0f} bytes/session "
+              f"({len(engine.sessions)} bots in memory)")
+    if store is not None and not quiet:
+        pages = store.db.execute("PRAGMA page_count").fetchone()[0]
+        page_size = store.db.execute("PRAGMA page_size").fetchone()[0]
+        print(f"{'':>9}  {pages * page_size / customers:8.0f} bytes/session "
+              f"in the SessionStore, not counted above")
+    start = time.perf_counter()
+    for transport in transports:
+        transport.hang_up()
+    while engine.sessions or engine.dropped < customers:
+        await asyncio.sleep(0.01)
+    if store is not None and not quiet:
+        print(f"rehydrating {customers} sessions: "
+              f"{(time.perf_counter() - start) / customers * 1e6:.1f} us/session")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, nargs="+",
+                        default=[10000, 100000])
+    args = parser.parse_args()
+    # a few sessions first, so caches filled by the first conversations are
+    # not counted against every session
+    asyncio.run(run(100, None, quiet=True))
+    for customers in args.customers:
+        print(f"{customers} sessions; the transport alone is "
+              f"{transport_bytes(customers):.0f} bytes/session")
+        asyncio.run(run(customers, None))
+        asyncio.run(run(customers, SessionStore()))
+
+
+if __name__ == "__main__":
+    main()
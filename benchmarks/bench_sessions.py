@@ -0,0 +1,68 @@
+# Load test: N simulated customers chatting with one SessionEngine at once
+# over in-memory transports. Reports turns/sec and turn latency percentiles.
+# Run from the repository root:
+#   python benchmarks/bench_sessions.py --customers 2000
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sessions import SessionEngine
+
+SCRIPT = [
+    "Bill",
+    "menu",
+    "what is the special",
+    "I want a large original milk tea with tapioca pearls less ice normal sugar",
+    "how much is that",
+    "hmm",
+    "goodbye",
+]
+
+
+# -> listof Float
+# plays SCRIPT as one customer, returning the latency of each turn
+async def customer(engine, customer_id):
+    transport = engine.open_memory_session(customer_id)
+    await transport.replies() # greeting
+    latencies = []
+    for text in SCRIPT:
+        start = time.perf_counter()
+        await transport.turn(text)
+        latencies.append(time.perf_counter() - start)
+        if transport.closed:
+            break
+    return latencies
+
+
+# listof Float, Float -> Float
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run(customers):
+    engine = SessionEngine()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(customer(engine, i)
+                                     for i in range(customers)))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for turns in results for latency in turns]
+    print(f"{customers} customers, {len(latencies)} turns in {elapsed:.2f}s "
+          f"({engine.completed} completed, {engine.dropped} dropped)")
+    print(f"throughput: {len(latencies) / elapsed:,.0f} turns/sec")
+    for label, fraction in (("p50", 0.50), ("p90", 0.90), ("p99", 0.99)):
+        print(f"{label} turn latency: {percentile(latencies, fraction) * 1e3:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.customers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# Benchmark: N simulated customers chatting through a sharding.Dispatcher
+# with 1, 2, ... worker processes, over in-memory transports on the
+# dispatcher's side. Reports turns/sec for each worker count; throughput can
+# only grow with workers while there are free cores. Run from the repository
+# root:
+#   python benchmarks/bench_sharding.py --customers 2000 --workers 4
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sharding import Dispatcher
+from bench_sessions import SCRIPT, customer, percentile
+
+
+async def run(customers, workers, max_pending):
+    dispatcher = Dispatcher(workers, max_pending)
+    dispatcher.start()
+    try:
+        # one conversation per worker first, so start-up is not timed
+        await asyncio.gather(*(customer(dispatcher, f"warm{i}")
+                               for i in range(workers * 4)))
+        start = time.perf_counter()
+        results = await asyncio.gather(*(customer(dispatcher, i)
+                                         for i in range(customers)))
+        elapsed = time.perf_counter() - start
+    finally:
+        dispatcher.stop()
+    latencies = [latency for turns in results for latency in turns]
+    return len(latencies) / elapsed, percentile(latencies, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--customers", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args()
+    print(f"{args.customers} customers, {len(SCRIPT)} turns each, "
+          f"{os.cpu_count()} cores")
+    base = None
+    for workers in range(1, args.workers + 1):
+        throughput, p99 = asyncio.run(run(args.customers, workers,
+                                          args.max_pending))
+        base = base or throughput
+        print(f"{workers:2} workers: {throughput:8,.0f} turns/sec "
+              f"({throughput / base:.2f}x), p99 turn {p99 * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
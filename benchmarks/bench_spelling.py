@@ -0,0 +1,87 @@
+# Micro-benchmark: CorrectionIndex vs. the original nested edit_distance loop
+# used by BTBot.reply_cleaner. Run from the repository root:
+#   python benchmarks/bench_spelling.py
+import os
+import random
+import sys
+import timeit
+
+from nltk.metrics import edit_distance
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from BubbleTeaChatboy import BTBot
+from spelling import CorrectionIndex
+from tokens import corrected
+
+VOCABULARY = BTBot.all_important_words
+
+UTTERANCES = [
+    "I want a large orignal milk tea with tapoca pearls",
+    "can I get the specal",
+    "how much is that",
+    "I'd like a small stormy pouf and a medum unicorn confeti",
+    "less ice and nomal sugar please",
+    "whiped cream and red bean",
+    "what do you recomend",
+    "menu",
+]
+
+
+# listof Str -> listof Str
+# the correction loop from the original reply_cleaner; words that match more
+# than one vocabulary word keep the first match (the original code raised
+# ValueError on the second replacement)
+def nested_loop(tokenized_text):
+    tokenized_text = list(tokenized_text)
+    for position, word in enumerate(tokenized_text):
+        if word == 'no': continue
+        for correctly_spelt_word in VOCABULARY:
+            if edit_distance(word, correctly_spelt_word) == 1:
+                tokenized_text[position] = correctly_spelt_word
+                break
+    return tokenized_text
+
+
+# listof Str, CorrectionIndex -> listof Str
+# the words as reply_cleaner corrects them
+def index_correct(words, index):
+    return list(corrected(words, index))
+
+
+def mutations(word, rng):
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    i = rng.randrange(len(word) + 1)
+    c = rng.choice(alphabet)
+    return rng.choice([word[:i] + c + word[i:],
+                       word[:i] + word[i+1:],
+                       word[:i] + c + word[i+1:]])
+
+
+def main():
+    rng = random.Random(0)
+    index = CorrectionIndex(VOCABULARY)
+
+    tokens = [mutations(rng.choice(VOCABULARY), rng) for _ in range(2000)]
+    tokens += [word for utterance in UTTERANCES for word in utterance.split()]
+    for token in tokens:
+        expected = nested_loop([token])
+        actual = index_correct([token], index)
+        assert expected == actual, (token, expected, actual)
+    print(f"{len(tokens)} tokens corrected identically")
+
+    turns = [utterance.split() for utterance in UTTERANCES]
+    number = 200
+    old = timeit.timeit(lambda: [nested_loop(t) for t in turns], number=number)
+    fresh = timeit.timeit(lambda: [index_correct(t, CorrectionIndex(VOCABULARY))
+                                   for t in turns], number=number)
+    new = timeit.timeit(lambda: [index_correct(t, index) for t in turns],
+                        number=number)
+    per_turn = number * len(turns)
+    print(f"nested edit_distance loop: {old / per_turn * 1e6:9.1f} us/turn")
+    print(f"index, rebuilt every turn: {fresh / per_turn * 1e6:9.1f} us/turn")
+    print(f"prebuilt index:            {new / per_turn * 1e6:9.1f} us/turn")
+    print(f"speedup: {old / new:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Benchmark: routing deliveries to the nearest open store, one at a time
+# through the KD-tree and all at once with batch_route, against checking
+# every store for every delivery. Uses a synthetic chain of stores and FSAs
+# around Toronto. Run from the repository root:
+#   python benchmarks/bench_stores.py --stores 200 --deliveries 20000
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import geo
+import stores
+
+
+def synthetic_stores(rng, count):
+    return [stores.Store(number, f"store {number}", "M4Y",
+                         rng.uniform(43.55, 43.85), rng.uniform(-79.65, -79.15),
+                         rng.choice([600, 660, 720]), rng.choice([1260, 1380, 60]),
+                         rng.choice([25, 30, 35, 40]))
+            for number in range(count)]
+
+
+def synthetic_codes(rng, count=600):
+    coordinates = {}
+    while len(coordinates) < count:
+        code = f"{rng.choice('KLMN')}{rng.randrange(10)}{rng.choice('ABCEGHJKLMNPRSTVXY')}"
+        coordinates[code] = (rng.uniform(43.4, 44.0), rng.uniform(-79.9, -78.9))
+    return coordinates
+
+
+# the nearest open store by comparing against every store
+def brute_force(registry, geocoder, code, minute):
+    lat, lon = geocoder.coordinates(code)
+    km = geo.haversine_km(lat, lon, registry.latitudes, registry.longitudes)
+    return int(np.argmin(np.where(registry.open_at(minute), km, np.inf)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stores", type=int, default=200)
+    parser.add_argument("--deliveries", type=int, default=20000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    now = datetime.datetime(2026, 1, 5, 12, 30)
+    registry = stores.StoreRegistry(synthetic_stores(rng, args.stores))
+    geocoder = geo.Geocoder.from_coordinates(synthetic_codes(rng))
+    codes = [code.decode() for code in np.asarray(geocoder.codes)]
+    deliveries = [rng.choice(codes) for _ in range(args.deliveries)]
+    single = deliveries[:2000]
+    minute = now.hour * 60 + now.minute
+
+    start = time.perf_counter()
+    expected = [brute_force(registry, geocoder, code, minute) for code in single]
+    brute_time = (time.perf_counter() - start) / len(single)
+
+    start = time.perf_counter()
+    routed = [registry.route(code, geocoder, now)[0].id for code in single]
+    route_time = (time.perf_counter() - start) / len(single)
+    assert routed == expected
+
+    start = time.perf_counter()
+    store_ids, minutes = registry.batch_route(deliveries, geocoder, now)
+    batch_time = time.perf_counter() - start
+    assert list(store_ids[:len(single)]) == expected
+
+    print(f"{args.stores} stores, {len(codes)} FSAs")
+    print(f"every store per delivery: {brute_time * 1e6:8.1f} us/delivery")
+    print(f"KD-tree (route):          {route_time * 1e6:8.1f} us/delivery")
+    print(f"batch_route, {args.deliveries} at once: {batch_time * 1e3:.1f} ms "
+          f"({batch_time / args.deliveries * 1e6:.2f} us/delivery)")
+
+
+if __name__ == "__main__":
+    main()
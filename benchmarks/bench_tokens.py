@@ -0,0 +1,83 @@
+# Benchmark: one token pass (tokens.py) vs. the old two tokenizers, where
+# reply_cleaner built a RegexpTokenizer per call and essential_words re-ran
+# nltk's word_tokenize (punkt) over the cleaned string. Reports CPU per turn
+# and memory allocated per turn. Run from the repository root:
+#   python benchmarks/bench_tokens.py
+import os
+import sys
+import time
+import tracemalloc
+
+from nltk.tokenize import RegexpTokenizer, word_tokenize
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from BubbleTeaChatboy import BTBot
+from spelling import correction_index
+from tokens import corrected
+
+UTTERANCES = [
+    "I want a large orignal milk tea with tapoca pearls and less ice",
+    "can I get a small stormy pouf and a medum unicorn confeti normal sugar",
+    "whiped cream and red bean please",
+    "menu",
+    "how much is that",
+] * 200
+
+
+def old_turn(bot, index, text):
+    tokenizer = RegexpTokenizer(r'\w+')
+    cleaned = " ".join(corrected(tokenizer.tokenize(text), index))
+    return [word for word in word_tokenize(cleaned) if word in bot.keywords]
+
+
+def new_turn(bot, index, text):
+    return bot.essential_words(bot.reply_cleaner(text))
+
+
+# -> (Float, Int)
+# CPU seconds and bytes allocated per turn
+def measure(turn, bot, index):
+    start = time.process_time()
+    for text in UTTERANCES:
+        turn(bot, index, text)
+    cpu = (time.process_time() - start) / len(UTTERANCES)
+    tracemalloc.start()
+    allocated = 0
+    for text in UTTERANCES[:100]:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        turn(bot, index, text)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return cpu, allocated / 100
+
+
+def main():
+    bot = BTBot()
+    index = correction_index(tuple(bot.all_important_words))
+    for text in UTTERANCES[:5]:
+        new_turn(bot, index, text) # warm caches
+    try:
+        old_turn(bot, index, UTTERANCES[0])
+    except LookupError:
+        # without punkt, measure the old path with word_tokenize's sentence
+        # splitting left out, which understates what it used to cost
+        print("punkt is not installed; old path measured without it")
+        from nltk.tokenize import TreebankWordTokenizer
+        treebank = TreebankWordTokenizer()
+        global word_tokenize
+        word_tokenize = treebank.tokenize
+    for text in UTTERANCES[:5]:
+        assert old_turn(bot, index, text) == new_turn(bot, index, text), text
+
+    old_cpu, old_bytes = measure(old_turn, bot, index)
+    new_cpu, new_bytes = measure(new_turn, bot, index)
+    print(f"two tokenizers: {old_cpu * 1e6:7.1f} us CPU/turn, "
+          f"{old_bytes:8.0f} bytes peak/turn")
+    print(f"one token pass: {new_cpu * 1e6:7.1f} us CPU/turn, "
+          f"{new_bytes:8.0f} bytes peak/turn")
+    print(f"CPU saved: {(1 - new_cpu / old_cpu) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import collections
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+# Streams inputs of any size through a function one chunk at a time, in this
+# process or across a process pool, for the batch tools
+# (sentiment.score_feedback, batch_orders.parse_orders). At most two chunks
+# per worker are in flight at any time, so memory stays bounded however large
+# the input is.
+
+
+# iterable, Int -> iterable of list
+def chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# (list -> Any), iterable, Int -> iterable of Any
+# function's result for each chunk of items, in input order. With processes,
+# chunks are spread over that many worker processes, each first running
+# initializer if given; function must then be picklable.
+def map_chunks(function, items, chunk_size, processes=None, initializer=None):
+    if not processes:
+        for chunk in chunks(items, chunk_size):
+            yield function(chunk)
+        return
+    with ProcessPoolExecutor(processes, initializer=initializer) as pool:
+        pending = collections.deque()
+        for chunk in chunks(items, chunk_size):
+            pending.append(pool.submit(function, chunk))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
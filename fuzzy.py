@@ -0,0 +1,149 @@
+from collections import Counter
+from functools import lru_cache
+
+# Resolves badly misspelled words to the words of menu item names, for what
+# CorrectionIndex (one edit at most) leaves alone: "strawbry", "tapiokka".
+# Words are compared by their character trigrams, padded with $ at both
+# ends, as the cosine of their trigram counts, and only with words of about
+# their own length, so that "straw" is not taken for "strawberry". Every
+# vocabulary word is a column of one trigram-by-word matrix, already divided
+# by the word's norm, so scoring all the unknown words of an utterance
+# against every word of the menu is one gather of the rows of their trigrams
+# and one np.add.reduceat, whatever the size of the menu. NumPy is imported
+# on first use, like in pricing.
+#
+# Trigrams alone are too generous with ordinary words ("store" shares half
+# its trigrams with "stormy"), so a match must also be within a few edits of
+# the word: one per four letters, and never more than max_edits. The
+# best-scoring word within reach wins. Words under five letters are left to
+# CorrectionIndex, since they may only be one edit off.
+
+
+# Str -> listof Str
+def trigrams(word):
+    padded = f"${word}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+# Str, Str, Int -> Int
+# the Levenshtein distance between a and b, or limit + 1 once it is sure to
+# be more than limit
+def edit_distance(a, b, limit):
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, letter in enumerate(a, 1):
+        current = [i]
+        for j, other in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (letter != other)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class FuzzyResolver:
+    # iterable of Str: the words to resolve to, earlier words winning ties;
+    # Float: the lowest trigram cosine accepted; Int: shorter words are left
+    # alone, as they share too few trigrams to tell apart; Float: the least
+    # ratio of the shorter to the longer length of two words compared; Int:
+    # the most edits a word may be from the word it resolves to
+    def __init__(self, vocabulary, threshold=0.5, min_length=5,
+                 length_ratio=0.7, max_edits=2):
+        import numpy as np
+        self.vocabulary = list(dict.fromkeys(vocabulary))
+        self.known = frozenset(self.vocabulary)
+        self.threshold = threshold
+        self.min_length = min_length
+        self.length_ratio = length_ratio
+        self.max_edits = max_edits
+        self.lengths = np.array([len(word) for word in self.vocabulary],
+                                dtype=np.float32)
+        self.trigram_ids = {} # trigram -> row
+        counts = [Counter(trigrams(word)) for word in self.vocabulary]
+        for word_counts in counts:
+            for trigram in word_counts:
+                self.trigram_ids.setdefault(trigram, len(self.trigram_ids))
+        self.matrix = np.zeros((len(self.trigram_ids) + 1,
+                                len(self.vocabulary)), dtype=np.float32)
+        for column, word_counts in enumerate(counts):
+            norm = np.sqrt(sum(count * count
+                               for count in word_counts.values()))
+            for trigram, count in word_counts.items():
+                self.matrix[self.trigram_ids[trigram], column] = count / norm
+        # the last row is all zeros, for trigrams no vocabulary word has
+        self.unknown = len(self.trigram_ids)
+        self.cache = {}
+        self.cache_size = 4096
+
+    # Str -> Bool
+    # whether word is worth resolving at all
+    def candidate(self, word):
+        return (len(word) >= self.min_length and word.isalpha()
+                and word not in self.known)
+
+    # Str -> Int
+    # the most edits word may be from the word it resolves to
+    def edits_allowed(self, word):
+        return min(self.max_edits, len(word) // 4)
+
+    # Str, ndarray -> Str or None
+    # the best-scoring vocabulary word within edits_allowed of word, of those
+    # scoring at least threshold
+    def _closest(self, word, scores):
+        import numpy as np
+        limit = self.edits_allowed(word)
+        columns = np.flatnonzero(scores >= self.threshold)
+        # stable, so earlier vocabulary words still win ties
+        for column in columns[np.argsort(-scores[columns], kind="stable")]:
+            match = self.vocabulary[column]
+            if edit_distance(word, match, limit) <= limit:
+                return match
+        return None
+
+    # listof Str -> listof (Str or None)
+    # the vocabulary word each of words resolves to, or None where none is
+    # close enough or the word is not a candidate
+    def resolve(self, words):
+        import numpy as np
+        resolved = [self.cache.get(word) for word in words]
+        todo = [position for position, word in enumerate(words)
+                if word not in self.cache and self.candidate(word)]
+        if not todo:
+            return resolved
+        rows, starts, norms = [], [], []
+        for position in todo:
+            word_counts = Counter(trigrams(words[position]))
+            starts.append(len(rows))
+            for trigram, count in word_counts.items():
+                rows.extend([self.trigram_ids.get(trigram, self.unknown)]
+                            * count)
+            norms.append(np.sqrt(sum(count * count
+                                     for count in word_counts.values())))
+        scores = np.add.reduceat(self.matrix[rows], starts, axis=0)
+        scores /= np.asarray(norms, dtype=np.float32)[:, None]
+        lengths = np.array([len(words[position]) for position in todo],
+                           dtype=np.float32)[:, None]
+        ratios = (np.minimum(lengths, self.lengths)
+                  / np.maximum(lengths, self.lengths))
+        scores[ratios < self.length_ratio] = 0
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        for position, word_scores in zip(todo, scores):
+            word = self._closest(words[position], word_scores)
+            self.cache[words[position]] = resolved[position] = word
+        return resolved
+
+
+# tuple of Str -> FuzzyResolver
+@lru_cache(maxsize=8)
+def _compiled(words):
+    return FuzzyResolver(words)
+
+
+# the FuzzyResolver for the words of these menus' item names, built once per
+# version of the menus
+def menu_resolver(drinks_menu, toppings_menu):
+    return _compiled(tuple(word for name in (*drinks_menu, *toppings_menu)
+                           for word in name.split()))
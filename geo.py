@@ -0,0 +1,171 @@
+import json
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+# Geocoding and delivery ETAs for checkout. The Canadian FSA table (the first
+# three characters of a postal code) is pulled from pgeocode once, saved as a
+# compact sorted array, and memory-mapped from then on, so lookups need
+# neither pandas nor the network. The table is not shipped: build it with
+# `python geo.py build` or BubbleTeaChatboy.warmup() before serving, as a
+# checkout never downloads it.
+
+STORE_POSTAL = "m4y" # Toronto Yonge Street location
+EARTH_RADIUS = 6371 # km
+SPEED = 30 # kmph
+BUFFER = 10 # minutes
+FSA_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              "data", "ca_fsa.npy")
+FSA_FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "data", "fsa_fixture.json")
+FSA_DTYPE = np.dtype([('fsa', 'S3'), ('latitude', 'f8'), ('longitude', 'f8')])
+
+
+# Str -> Str
+def fsa(postal_code):
+    return postal_code.strip()[:3].upper()
+
+
+# Haversine forumla for measuring distance between points, in km. Works on
+# floats and on NumPy arrays alike.
+def haversine_km(lat1, lon1, lat2, lon2):
+    dlat = np.radians(lat2 - lat1)
+    dlon = np.radians(lon2 - lon1)
+    a = np.sin(dlat/2) * np.sin(dlat/2) + np.cos(np.radians(lat1)) \
+        * np.cos(np.radians(lat2)) * np.sin(dlon/2) * np.sin(dlon/2)
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    return EARTH_RADIUS * c
+
+
+# Float, Float -> Float
+# minutes to deliver over km at speed kmph; works on NumPy arrays too
+def travel_minutes(km, speed=SPEED):
+    return (km/speed) * 60 + BUFFER
+
+
+# Downloads the Canadian postal code data through pgeocode (needs network the
+# first time) and writes it to path as a sorted FSA table.
+def build_fsa_index(path=FSA_INDEX_PATH):
+    import pgeocode
+    frame = pgeocode.Nominatim('ca')._data_frame
+    frame = frame.dropna(subset=['latitude', 'longitude'])
+    table = np.zeros(len(frame), dtype=FSA_DTYPE)
+    table['fsa'] = [fsa(code) for code in frame['postal_code']]
+    table['latitude'] = frame['latitude'].to_numpy()
+    table['longitude'] = frame['longitude'].to_numpy()
+    table.sort(order='fsa')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.save(path, table)
+    return path
+
+
+# Str -> Str
+# path, after building the FSA table there if it is missing
+def ensure_fsa_index(path=FSA_INDEX_PATH):
+    if not os.path.exists(path):
+        build_fsa_index(path)
+    return path
+
+
+class Geocoder:
+    # table: array of FSA_DTYPE sorted by fsa
+    def __init__(self, table, store_postal=STORE_POSTAL, cache_size=4096):
+        self.table = table
+        self.codes = table['fsa']
+        self.store = self.coordinates(store_postal)
+        self.cached_eta = lru_cache(maxsize=cache_size)(self._eta_minutes)
+
+    # memory-maps the FSA table at path; raises FileNotFoundError if it has
+    # not been built
+    @classmethod
+    def load(cls, path=FSA_INDEX_PATH, **kwargs):
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"FSA table {path} is missing; run `python geo.py build` "
+                f"or warmup() before serving")
+        return cls(np.load(path, mmap_mode='r'), **kwargs)
+
+    # dictof Str: (Float, Float) -> Geocoder
+    # a geocoder over a handful of known FSAs, e.g. for tests and replays
+    @classmethod
+    def from_coordinates(cls, coordinates, **kwargs):
+        table = np.zeros(len(coordinates), dtype=FSA_DTYPE)
+        table['fsa'] = [fsa(code) for code in coordinates]
+        table['latitude'] = [lat for lat, lon in coordinates.values()]
+        table['longitude'] = [lon for lat, lon in coordinates.values()]
+        table.sort(order='fsa')
+        return cls(table, **kwargs)
+
+    # listof Str -> (array of Int, array of Bool)
+    # positions of the given FSAs in the table, and which of them exist
+    def positions(self, postal_codes):
+        wanted = np.array([fsa(code) for code in postal_codes], dtype='S3')
+        found = np.searchsorted(self.codes, wanted)
+        found = np.minimum(found, len(self.codes) - 1)
+        return found, self.codes[found] == wanted
+
+    # Str -> (Float, Float)
+    def coordinates(self, postal_code):
+        (position,), (known,) = self.positions([postal_code])
+        if not known:
+            raise ValueError(f"unknown postal code {postal_code!r}")
+        row = self.table[position]
+        return float(row['latitude']), float(row['longitude'])
+
+    # Str -> Int
+    # minutes for a delivery from the store to postal_code, cached per FSA
+    def eta_minutes(self, postal_code):
+        return self.cached_eta(fsa(postal_code))
+
+    def _eta_minutes(self, fsa_code):
+        lat1, lon1 = self.coordinates(fsa_code)
+        lat2, lon2 = self.store
+        return round(travel_minutes(float(haversine_km(lat1, lon1, lat2, lon2))))
+
+    # listof Str -> array of Float
+    # ETAs in minutes for many postal codes at once; NaN for unknown codes
+    def batch_eta(self, postal_codes):
+        found, known = self.positions(postal_codes)
+        rows = self.table[found]
+        lat2, lon2 = self.store
+        minutes = np.round(travel_minutes(haversine_km(
+            rows['latitude'], rows['longitude'], lat2, lon2)))
+        return np.where(known, minutes, np.nan)
+
+
+# Str -> Geocoder
+# a geocoder over the few Toronto FSAs in a local JSON fixture, for replays
+# and benchmarks that must not depend on the full table or the network
+def load_fixture(path=FSA_FIXTURE_PATH, **kwargs):
+    with open(path) as fixture:
+        return Geocoder.from_coordinates(json.load(fixture), **kwargs)
+
+
+_geocoder = None
+
+# the process-wide Geocoder, loaded on first use
+def default_geocoder():
+    global _geocoder
+    if _geocoder is None:
+        _geocoder = Geocoder.load()
+    return _geocoder
+
+
+# Str -> Int
+def eta_minutes(postal_code):
+    return default_geocoder().eta_minutes(postal_code)
+
+
+# listof Str -> array of Float
+def batch_eta(postal_codes):
+    return default_geocoder().batch_eta(postal_codes)
+
+
+if __name__ == "__main__":
+    # python geo.py build [path]: fetch and save the FSA table ahead of time
+    if sys.argv[1:2] == ["build"]:
+        print(build_fsa_index(*sys.argv[2:3]))
+    else:
+        print("usage: python geo.py build [path]")
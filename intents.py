@@ -0,0 +1,65 @@
+import re
+from functools import lru_cache
+
+# Phrasings for each intent BTBot understands. Intents are tried in this
+# order, and the first one with a matching phrasing wins.
+ORDER_COMMANDS = {
+    'special_order':[r'.*order.*special.*'],
+    r'price_inquiry':[r'.*much.*that', r'.*much.*this'],
+    r'suggested_order':[r'.*want.*that', r'.*sounds\sgood.*',
+                        r'.*get.*that.*', r'.*get.*special.*',
+                        r'.*order.*special.*', r'order.*that.*'],
+    r'describe_specials': [r'.*special.*', r'.*\recommend.*'],
+    r'menu_inquiry':[r'.*menu.*', r'.*choice.*', r'.*option.*'],
+    r'single_order': [r'.*want.*', r'.*order.*',r'.*get.*'],
+    r'checkout': [r'.*checkout.*', r'.*done.*', r'.*bill.*',
+                  r'all.*', r'.*no.*']}
+
+
+# Intents with phrasings but no handler in BTBot.match_reply. The old loop
+# matched them and, doing nothing, went on to the next phrasing, so they are
+# left out of the classifier: "how much to order that special" is a
+# price_inquiry, not an order.
+UNHANDLED = frozenset({'special_order'})
+
+
+# dictof Str: listof Str -> dictof Str: listof Str
+def handled(order_commands):
+    return {intent: phrasing for intent, phrasing in order_commands.items()
+            if intent not in UNHANDLED}
+
+
+# Every phrasing of every intent compiled into a single alternation, with one
+# named group per intent. Regex alternation is tried left to right, so the
+# first intent in order_commands that matches is the one reported, exactly as
+# if each pattern had been tried with re.match in turn.
+class IntentClassifier:
+    # dictof Str: listof Str
+    def __init__(self, order_commands):
+        self.intents = list(order_commands)
+        alternatives = []
+        for intent, phrasing in order_commands.items():
+            alternatives.append(f"(?P<{intent}>{'|'.join(phrasing)})")
+        self.pattern = re.compile("|".join(alternatives))
+
+    # Str -> Str or None
+    # name of the intent that fired for reply, or None if nothing matched
+    def classify(self, reply):
+        found_match = self.pattern.match(reply)
+        if found_match:
+            return found_match.lastgroup
+        return None
+
+
+# tuple of (Str, tuple of Str) -> IntentClassifier
+@lru_cache(maxsize=8)
+def _compiled(commands):
+    return IntentClassifier({intent: list(phrasing)
+                             for intent, phrasing in commands})
+
+
+# dictof Str: listof Str -> IntentClassifier
+# compiled once per process for each distinct set of commands
+def compile_intents(order_commands):
+    return _compiled(tuple((intent, tuple(phrasing))
+                           for intent, phrasing in order_commands.items()))
@@ -0,0 +1,72 @@
+from collections import namedtuple
+from functools import lru_cache
+
+# Finds menu items in a sequence of words. Every word of every item name is
+# indexed, and multi-word names are stored in a trie so that "original milk
+# tea" is recognised as one item spanning three words, all in a single pass
+# over the words with no scanning of the menu.
+
+MenuItem = namedtuple('MenuItem', ['id', 'kind', 'name'])
+Match = namedtuple('Match', ['item', 'start', 'end', 'word'])
+
+END = None # trie key marking the end of a name
+
+
+class PhraseIndex:
+    # dictof Str: iterable of Str, item names by kind, e.g.
+    # {"drink": drinks_menu, "topping": toppings_menu}; kinds listed first win
+    # when a word appears in names of more than one kind
+    def __init__(self, menus):
+        self.items = []
+        self.words = {} # word -> first item whose name has it
+        self.words_by_kind = {kind: {} for kind in menus}
+        self.trie = {}
+        for kind, names in menus.items():
+            for name in names:
+                item = MenuItem(len(self.items), kind, name)
+                self.items.append(item)
+                node = self.trie
+                for word in name.split():
+                    self.words.setdefault(word, item)
+                    self.words_by_kind[kind].setdefault(word, item)
+                    node = node.setdefault(word, {})
+                node.setdefault(END, item)
+
+    # Str -> MenuItem or None
+    # the item a single word refers to, optionally only among one kind
+    def lookup(self, word, kind=None):
+        if kind is None:
+            return self.words.get(word)
+        return self.words_by_kind[kind].get(word)
+
+    # listof Str -> iterable of Match
+    # one Match per menu item mentioned, spanning words[start:end], and one
+    # Match with item None for every other word. Full names are matched
+    # greedily (longest first); a lone word from a name matches that item.
+    # Given a kind, only items of that kind are matched.
+    def scan(self, words, kind=None):
+        words = list(words)
+        position = 0
+        while position < len(words):
+            node, longest, end = self.trie, None, position
+            while end < len(words) and words[end] in node:
+                node = node[words[end]]
+                end += 1
+                if END in node and kind in (None, node[END].kind):
+                    longest = (node[END], end)
+            if longest:
+                item, end = longest
+            else:
+                item, end = self.lookup(words[position], kind), position + 1
+            yield Match(item, position, end, words[position])
+            position = end
+
+
+@lru_cache(maxsize=8)
+def _compiled(drinks, toppings):
+    return PhraseIndex({"drink": drinks, "topping": toppings})
+
+
+# the PhraseIndex for this version of the menus, built once per version
+def phrase_index(drinks_menu, toppings_menu):
+    return _compiled(tuple(drinks_menu), tuple(toppings_menu))
@@ -0,0 +1,129 @@
+import datetime
+import functools
+import time
+from types import MappingProxyType
+
+import pricing
+from fuzzy import menu_resolver
+from menu_index import phrase_index
+
+# The menus, and the daily snapshot of them the bot serves from. A snapshot
+# is built once per day with everything derived from the menus (today's
+# special and its discount, the price table, the phrase index and the menu
+# tables as text) and never changes afterwards. current_menu() swaps in the
+# next day's snapshot at midnight, so a long-running server always shows
+# today's special and every conversation turn sees one consistent menu.
+
+base_drinks_menu = MappingProxyType({
+    'strawberry pineapple explosion': 4.30,
+    'unicorn confetti': 3.75,
+    'stormy pouf': 3.75,
+    'original milk tea': 3.50,
+    'sunshine yogurt': 4.50
+    })
+
+toppings_menu = MappingProxyType({
+    'tapioca pearls': 0.75,
+    'grass jelly': 1.5,
+    'red bean': 0.75,
+    'whipped cream': 1.00,
+    })
+
+size_menu = MappingProxyType({
+    'large': 1.00,
+    'medium': 0.5,
+    'small': 0
+    })
+
+specials = MappingProxyType({
+    0: 'strawberry pineapple explosion',
+    1: 'unicorn confetti',
+    2: 'stormy pouf',
+    3: 'original milk tea',
+    4: 'sunshine yogurt'
+    })
+
+SPECIAL_DISCOUNT = 1.5 # dollars off the daily special
+
+
+# Str, Float -> Str
+# one row of a menu table
+def _row(name, price):
+    return " ".join([f"|{name}", ' '*(42 -len(name)), f"|${price}",
+                     ' '*(4 - len(str(price))), "|"])
+
+
+class MenuSnapshot:
+    # datetime.date
+    def __init__(self, date):
+        self.date = date
+        self.version = date.isoformat()
+        self.day_name = date.strftime("%a")
+        self.special = specials[date.weekday() % len(specials)]
+        self.drinks = MappingProxyType({
+            **base_drinks_menu,
+            self.special: base_drinks_menu[self.special] - SPECIAL_DISCOUNT})
+        self.toppings = toppings_menu
+        self.sizes = size_menu
+        self.big_menu = MappingProxyType(
+            {**self.sizes, **self.toppings, **self.drinks})
+        self.prices = pricing.price_table(self.drinks, self.sizes,
+                                          self.toppings)
+        self.index = phrase_index(self.drinks, self.toppings)
+        # every word of every drink and topping name
+        self.words = frozenset(word for name in (*self.drinks, *self.toppings)
+                               for word in name.split())
+        self.text = MappingProxyType({"drinks": self._render_drinks(),
+                                      "toppings": self._render_toppings()})
+        # both tables, as sent for a menu inquiry
+        self.full_text = self.text["drinks"] + "\n" + self.text["toppings"]
+
+    # the fuzzy.FuzzyResolver for misspelled words of item names, built on
+    # first use as it needs NumPy
+    @functools.cached_property
+    def resolver(self):
+        return menu_resolver(self.drinks, self.toppings)
+
+    def _render_toppings(self):
+        lines = ["------------------------------------------------------",
+                 "|Toppings                                    |Price  |",
+                 "------------------------------------------------------"]
+        lines += [_row(name, price) for name, price in self.toppings.items()]
+        return "\n".join(lines)
+
+    def _render_drinks(self):
+        lines = ["------------------------------------------------------",
+                 "|Drinks (+$1.00 for Large, +$0.5 for Medium) |Price  |",
+                 "------------------------------------------------------"]
+        for name, price in self.drinks.items():
+            if name == self.special:
+                name = name + f" ({self.day_name}'s Special)"
+            lines.append(_row(name, price))
+        return "\n".join(lines)
+
+
+_current = None # the snapshot being served
+_expires = 0.0  # time.time() at which _current goes stale (next midnight)
+
+
+# datetime.date -> Float
+# the timestamp of the next local midnight
+def _next_midnight(date):
+    tomorrow = datetime.datetime.combine(date + datetime.timedelta(days=1),
+                                         datetime.time())
+    return tomorrow.timestamp()
+
+
+# -> MenuSnapshot
+# today's menu. Costs one clock read until midnight, when the next day's
+# snapshot is built and replaces the old one in a single assignment; callers
+# holding the old snapshot keep a complete, consistent menu.
+def current_menu():
+    global _current, _expires
+    if time.time() < _expires:
+        return _current
+    today = datetime.date.today()
+    if _current is None or _current.date != today:
+        _current = MenuSnapshot(today)
+    _expires = _next_midnight(today)
+    return _current
@@ -0,0 +1,224 @@
+import bisect
+import functools
+import inspect
+import json
+import random
+import time
+from contextlib import contextmanager
+
+# Timing spans and counters for the stages of a conversation turn. Off by
+# default: until configure() turns it on, an instrumented function costs one
+# attribute check per call. Spans around coroutines leave out the time spent
+# waiting for the customer to answer (BTBot.io_wait), so they measure only
+# the bot's own work.
+
+# histogram bucket upper bounds, in seconds
+BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+           0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1) # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    # Float -> None
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+class Registry:
+    def __init__(self):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.histograms = {} # (stage, tags) -> Histogram
+        self.calls = {}      # stage -> Int, sampled or not
+        self.counters = {}   # name -> function giving the current count
+
+    # -> Bool
+    def sampled(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    # Str, Float, tuple of (Str, Str) -> None
+    def observe(self, stage, seconds, tags=()):
+        key = (stage, tags)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        self.histograms[key].observe(seconds)
+
+    # Str -> None
+    def count(self, stage):
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    # Str, (-> Int) -> None
+    # exports a count kept elsewhere (e.g. cache hits) as the counter name
+    def register_counter(self, name, read):
+        self.counters[name] = read
+
+    def reset(self):
+        self.histograms.clear()
+        self.calls.clear()
+
+    # -> dictof Str: Any
+    def snapshot(self):
+        return {
+            "sample_rate": self.sample_rate,
+            "buckets": list(BUCKETS),
+            "calls": dict(self.calls),
+            "counters": {name: read() for name, read in self.counters.items()},
+            "stages": [{"stage": stage, "tags": dict(tags),
+                        "counts": histogram.counts, "sum": histogram.sum,
+                        "count": histogram.count}
+                       for (stage, tags), histogram in self.histograms.items()],
+        }
+
+    # -> Str
+    # the metrics in Prometheus' text exposition format
+    def prometheus_text(self):
+        lines = ["# HELP btbot_calls_total Calls to each instrumented stage.",
+                 "# TYPE btbot_calls_total counter"]
+        for stage, calls in sorted(self.calls.items()):
+            lines.append(f'btbot_calls_total{{stage="{stage}"}} {calls}')
+        for name, read in sorted(self.counters.items()):
+            lines += [f"# TYPE btbot_{name}_total counter",
+                      f"btbot_{name}_total {read()}"]
+        lines += ["# HELP btbot_stage_seconds Time spent in each stage "
+                  "(sampled).",
+                  "# TYPE btbot_stage_seconds histogram"]
+        for (stage, tags), histogram in sorted(self.histograms.items()):
+            labels = f'stage="{stage}"' + "".join(
+                f',{key}="{value}"' for key, value in tags)
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f'btbot_stage_seconds_bucket{{{labels},'
+                             f'le="{bound}"}} {cumulative}')
+            lines.append(f"btbot_stage_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"btbot_stage_seconds_count{{{labels}}} "
+                         f"{histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    # Str -> None
+    def write_prometheus(self, path):
+        with open(path, "w") as out:
+            out.write(self.prometheus_text())
+
+    # Str -> None
+    def write_json(self, path):
+        with open(path, "w") as out:
+            json.dump(self.snapshot(), out, indent=2)
+
+
+registry = Registry()
+
+
+# turns instrumentation on or off; sample_rate is the fraction of calls timed
+def configure(enabled=True, sample_rate=1.0):
+    registry.enabled = enabled
+    registry.sample_rate = sample_rate
+
+
+# Any, Str or None -> tuple of (Str, Str)
+def _tags(owner, tag_attr):
+    if tag_attr is None:
+        return ()
+    return ((tag_attr, str(getattr(owner, tag_attr, None))),)
+
+
+# Decorator timing every call of a function or coroutine function as stage.
+# With tag_attr, each observation is tagged with that attribute of the
+# instance (the first argument), read once the call has returned.
+def timed(stage, tag_attr=None):
+    def decorate(function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def timed_coroutine(*args, **kwargs):
+                if not registry.enabled:
+                    return await function(*args, **kwargs)
+                registry.count(stage)
+                if not registry.sampled():
+                    return await function(*args, **kwargs)
+                owner = args[0] if args else None
+                waited = getattr(owner, "io_wait", 0.0)
+                start = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    elapsed -= getattr(owner, "io_wait", 0.0) - waited
+                    registry.observe(stage, elapsed, _tags(owner, tag_attr))
+            return timed_coroutine
+
+        @functools.wraps(function)
+        def timed_function(*args, **kwargs):
+            if not registry.enabled:
+                return function(*args, **kwargs)
+            registry.count(stage)
+            if not registry.sampled():
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                owner = args[0] if args else None
+                registry.observe(stage, time.perf_counter() - start,
+                                 _tags(owner, tag_attr))
+        return timed_function
+    return decorate
+
+
+# profiles whatever runs inside the block with cProfile, dumping the stats to
+# path (readable with pstats or snakeviz)
+@contextmanager
+def profiled(path):
+    import cProfile
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
+
+
+# Profile -> awaitable
+# awaitable, with profile enabled only while awaitable itself is running
+class _ProfiledSteps:
+    def __init__(self, awaitable, profile):
+        self.awaitable = awaitable
+        self.profile = profile
+
+    def __await__(self):
+        steps = self.awaitable.__await__()
+        sent, thrown = None, None
+        while True:
+            self.profile.enable()
+            try:
+                if thrown is None:
+                    waiting_on = steps.send(sent)
+                else:
+                    waiting_on = steps.throw(thrown)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.profile.disable()
+            try:
+                sent, thrown = (yield waiting_on), None
+            except BaseException as error:
+                sent, thrown = None, error
+
+
+# awaits awaitable, profiling it with cProfile and dumping the stats to path.
+# cProfile follows a thread, not a task, so profiled() around one of many
+# concurrent sessions would also count every other session the loop runs
+# meanwhile; here the profiler is on only during the awaitable's own steps.
+async def profiled_task(awaitable, path):
+    import cProfile
+    profile = cProfile.Profile()
+    try:
+        return await _ProfiledSteps(awaitable, profile)
+    finally:
+        profile.dump_stats(path)
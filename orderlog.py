@@ -0,0 +1,228 @@
+import argparse
+import datetime
+import json
+import mmap
+import os
+import queue
+import sys
+import threading
+import uuid
+
+# Durable record of every confirmed order, as an append-only JSONL file:
+#   {"date": "2026-10-18", "time": "12:03:44", "order_id": Str,
+#    "menu": "2026-10-18",
+#    "drinks": [{"name": ..., "size": ..., "toppings": [...], "sugar": ...,
+#                "ice": ..., "cents": Int}],
+#    "subtotal": Int, "total": Int, "fsa": "M5V", "store": "Junction",
+#    "eta": Int, "sentiment": null}
+# written as soon as the order is confirmed. The customer's feedback, given
+# afterwards if at all, follows as a record of its own, tied to the order by
+# its order_id (unique across logs, as sessions are served concurrently):
+#   {"date": ..., "time": ..., "order_id": Str, "fsa": "M5V",
+#    "sentiment": Float}
+# Checkout only queues the record. A writer thread commits whatever has queued
+# up in one write and one fsync, so orders arriving while the disk is busy
+# share the next flush instead of each waiting for their own. Reports read
+# the log through mmap a line at a time, so their memory does not grow with
+# the size of the log.
+
+_CLOSE = None # tells the writer thread to finish
+
+
+class OrderLog:
+    # Str, Int: the most records committed by one fsync
+    def __init__(self, path, batch_size=1024):
+        self.path = path
+        self.batch_size = batch_size
+        self.file = open(path, "ab")
+        self.queue = queue.SimpleQueue()
+        self.appended = 0  # records handed to append()
+        self.committed = 0 # records written and fsynced
+        self.commits = 0   # fsyncs
+        self.failed = 0    # records lost to write errors
+        self.done = threading.Condition()
+        self.writer = threading.Thread(target=self._write_batches,
+                                       name="orderlog", daemon=True)
+        self.writer.start()
+
+    # dictof Str: Any -> None
+    # queues record to be committed; never waits for the disk
+    def append(self, record):
+        with self.done:
+            self.appended += 1
+        self.queue.put(json.dumps(record, separators=(",", ":")).encode()
+                       + b"\n")
+
+    # Float or None -> Bool
+    # waits until every record appended so far has been committed (or lost),
+    # returning False on timeout
+    def flush(self, timeout=None):
+        target = self.appended
+        with self.done:
+            return self.done.wait_for(
+                lambda: self.committed + self.failed >= target, timeout)
+
+    # commits what is queued, then stops the writer and closes the file
+    def close(self):
+        self.queue.put(_CLOSE)
+        self.writer.join()
+
+    def _write_batches(self):
+        closing = False
+        while not closing:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _CLOSE in batch:
+                closing = True
+                batch = [line for line in batch if line is not _CLOSE]
+            if batch:
+                self._commit(batch)
+        self.file.close()
+
+    # listof bytes -> None
+    def _commit(self, batch):
+        try:
+            self.file.write(b"".join(batch))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        except OSError as error:
+            print(f"order log {self.path}: lost {len(batch)} orders: {error}",
+                  file=sys.stderr)
+            with self.done:
+                self.failed += len(batch)
+                self.done.notify_all()
+            return
+        with self.done:
+            self.committed += len(batch)
+            self.commits += 1
+            self.done.notify_all()
+
+
+# listof Drink, Int, Int, Str, Int, Float or None, MenuSnapshot, Str or None
+#   -> dictof Str: Any
+# the log record of a confirmed order; "date" comes first so that scan() can
+# pick out a day's orders without parsing the others
+def order_record(drinks, subtotal, total, fsa, eta, sentiment, menu,
+                 now=None, store=None):
+    now = now or datetime.datetime.now()
+    lines = []
+    for drink in drinks:
+        line = drink.as_record()
+        line["cents"] = drink.total_cents(menu)
+        lines.append(line)
+    return {"date": now.date().isoformat(), "time": now.strftime("%H:%M:%S"),
+            "order_id": uuid.uuid4().hex, "menu": menu.version,
+            "drinks": lines, "subtotal": subtotal,
+            "total": total, "fsa": fsa, "store": store, "eta": eta,
+            "sentiment": sentiment}
+
+
+# dictof Str: Any, Float, datetime.datetime -> dictof Str: Any
+# the log record of the feedback given on the order logged as order
+def feedback_record(order, sentiment, now=None):
+    now = now or datetime.datetime.now()
+    return {"date": now.date().isoformat(), "time": now.strftime("%H:%M:%S"),
+            "order_id": order["order_id"], "fsa": order["fsa"],
+            "sentiment": sentiment}
+
+
+# dictof Str: Any -> Bool
+def is_order(record):
+    return "drinks" in record
+
+
+# Str, Str or None -> iterable of dictof Str: Any
+# the records in the log at path, optionally only those of one date
+# (YYYY-MM-DD). A last line without its newline is an append still in
+# progress and is left out.
+def scan(path, date=None):
+    prefix = None if date is None else f'{{"date":"{date}"'.encode()
+    with open(path, "rb") as log:
+        if os.fstat(log.fileno()).st_size == 0:
+            return
+        with mmap.mmap(log.fileno(), 0, access=mmap.ACCESS_READ) as lines:
+            start = 0
+            while True:
+                end = lines.find(b"\n", start)
+                if end < 0:
+                    return
+                if prefix is None or lines[start:start + len(prefix)] == prefix:
+                    yield json.loads(lines[start:end])
+                start = end + 1
+
+
+class SalesReport:
+    def __init__(self):
+        self.orders = 0
+        self.revenue = 0 # cents, before tax and delivery
+        self.drinks = 0
+        self.with_toppings = 0 # drinks with at least one topping
+        self.items = {}    # drink name -> [sold, cents]
+        self.toppings = {} # topping -> drinks it was added to
+
+    # dictof Str: Any -> None
+    def add(self, record):
+        self.orders += 1
+        self.revenue += record["subtotal"]
+        for drink in record["drinks"]:
+            self.drinks += 1
+            sold = self.items.setdefault(drink["name"], [0, 0])
+            sold[0] += 1
+            sold[1] += drink["cents"]
+            toppings = set(drink["toppings"]) - {"nothing", None}
+            if toppings:
+                self.with_toppings += 1
+            for topping in toppings:
+                self.toppings[topping] = self.toppings.get(topping, 0) + 1
+
+    # -> dictof Str: Float
+    # the fraction of drinks each topping was added to
+    def attach_rates(self):
+        return {topping: count / self.drinks
+                for topping, count in sorted(self.toppings.items())}
+
+    def as_dict(self):
+        return {
+            "orders": self.orders,
+            "revenue_cents": self.revenue,
+            "drinks": self.drinks,
+            "items": {name: {"sold": sold, "cents": cents}
+                      for name, (sold, cents) in sorted(self.items.items())},
+            "topping_attach_rate": (self.with_toppings / self.drinks
+                                    if self.drinks else 0.0),
+            "attach_rates": self.attach_rates(),
+        }
+
+
+# iterable of dictof Str: Any -> dictof Str: SalesReport
+# one report per date, of the orders among records
+def daily_reports(records):
+    reports = {}
+    for record in records:
+        if not is_order(record):
+            continue
+        date = record["date"]
+        if date not in reports:
+            reports[date] = SalesReport()
+        reports[date].add(record)
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Daily sales and topping attach rates from an order log.")
+    parser.add_argument("path", help="order log (JSONL)")
+    parser.add_argument("--date", help="only this day (YYYY-MM-DD)")
+    args = parser.parse_args()
+    reports = daily_reports(scan(args.path, args.date))
+    json.dump({date: report.as_dict() for date, report in sorted(reports.items())},
+              sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from collections import OrderedDict, namedtuple
+
+import metrics
+
+# Customers say the same few things over and over ("menu", "what's the
+# special", "I want a large original milk tea with tapioca pearls"), so what
+# an utterance parses to is cached: its corrected text, its intent and, for
+# orders, the drinks it names. Only the parse is cached; everything the bot
+# then does with it still happens per conversation. Entries are keyed by the
+# menu version as well and all dropped when the menu changes.
+
+# corrected: Str, intent: Str or None, drinks: tuple of DrinkTemplate
+Parse = namedtuple('Parse', ['corrected', 'intent', 'drinks'])
+# an immutable Drink, for handing out fresh copies of cached drinks
+DrinkTemplate = namedtuple('DrinkTemplate',
+                           ['name', 'toppings', 'size', 'sugar', 'ice'])
+
+
+# Str -> Str
+# utterances differing only in surrounding or repeated whitespace parse alike
+def normalize(text):
+    return " ".join(text.split())
+
+
+class ParseCache:
+    # Int: the most parses kept
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict() # (menu version, text) -> Parse
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # Str, Str, (Str -> Parse) -> Parse
+    # the parse of text under menu version, computing it with parse on a miss
+    def get(self, text, version, parse):
+        if version != self.version:
+            self.invalidate()
+            self.version = version
+        key = (version, normalize(text))
+        found = self.entries.get(key)
+        if found is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return found
+        self.misses += 1
+        found = self.entries[key] = parse(text)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return found
+
+    # drops every entry, e.g. when the menu changes
+    def invalidate(self):
+        if self.entries:
+            self.invalidations += 1
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self.entries), "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+shared_cache = ParseCache() # used by every BTBot unless given another
+
+for _counter in ("hits", "misses", "evictions", "invalidations"):
+    metrics.registry.register_counter(
+        f"parse_cache_{_counter}",
+        lambda counter=_counter: getattr(shared_cache, counter))
@@ -0,0 +1,114 @@
+from array import array
+from functools import lru_cache
+
+# Exact pricing in integer cents. Each menu is compiled once into arrays of
+# cents indexed by item id, and a drink becomes a compact id tuple:
+#   (drink id, size id, (topping id, ...))
+
+TAX_RATE = 13   # percent, charged on drinks
+DELIVERY = 200  # cents, not taxed
+NO_TOPPINGS = ("nothing", None)
+
+
+# Float -> Int
+def cents(dollars):
+    return round(dollars * 100)
+
+
+# Int -> Str
+def dollars(amount):
+    sign = "-" if amount < 0 else ""
+    return f"{sign}{abs(amount) // 100}.{abs(amount) % 100:02d}"
+
+
+# Int -> Int
+# tax in cents, rounded half up
+def tax(subtotal):
+    return (subtotal * TAX_RATE + 50) // 100
+
+
+# Int -> Int
+def order_total(subtotal):
+    return subtotal + tax(subtotal) + DELIVERY
+
+
+class PriceTable:
+    # dictof Str: Float for each menu
+    def __init__(self, drinks_menu, size_menu, toppings_menu):
+        self.drink_ids = {name: i for i, name in enumerate(drinks_menu)}
+        self.size_ids = {name: i for i, name in enumerate(size_menu)}
+        self.topping_ids = {name: i for i, name in enumerate(toppings_menu)}
+        self.drink_cents = array('q', map(cents, drinks_menu.values()))
+        self.size_cents = array('q', map(cents, size_menu.values()))
+        self.topping_cents = array('q', map(cents, toppings_menu.values()))
+
+    # Drink -> (Int, Int, tuple of Int)
+    def encode(self, drink):
+        toppings = tuple(self.topping_ids[topping] for topping in drink.toppings
+                         if topping not in NO_TOPPINGS)
+        return self.drink_ids[drink.name], self.size_ids[drink.size], toppings
+
+    # (Int, Int, tuple of Int) -> Int
+    def line_cents(self, line):
+        drink_id, size_id, topping_ids = line
+        return (self.drink_cents[drink_id] + self.size_cents[size_id] +
+                sum(self.topping_cents[i] for i in topping_ids))
+
+    # Drink -> Int
+    def drink_cents_of(self, drink):
+        return self.line_cents(self.encode(drink))
+
+    # listof listof (Int, Int, tuple of Int) or OrderColumns -> listof Int
+    # subtotal in cents of each order, all orders priced in one pass
+    def price_orders(self, orders):
+        import numpy as np
+        if not isinstance(orders, OrderColumns):
+            orders = OrderColumns(orders)
+        drink_cents = np.frombuffer(self.drink_cents, dtype=np.int64)
+        size_cents = np.frombuffer(self.size_cents, dtype=np.int64)
+        topping_cents = np.frombuffer(self.topping_cents, dtype=np.int64)
+        # bincount sums in float64, which is exact for any realistic total
+        totals = np.bincount(orders.line_order, minlength=orders.count,
+                             weights=drink_cents[orders.drink_ids] +
+                                     size_cents[orders.size_ids])
+        totals += np.bincount(orders.topping_order, minlength=orders.count,
+                              weights=topping_cents[orders.topping_ids])
+        return np.rint(totals).astype(np.int64).tolist()
+
+
+# Many encoded orders stored column by column, as flat NumPy arrays, so that
+# they can be re-priced against any PriceTable without touching Python
+# objects again.
+class OrderColumns:
+    # listof listof (Int, Int, tuple of Int)
+    def __init__(self, orders):
+        import numpy as np
+        line_order, drink_ids, size_ids = array('q'), array('q'), array('q')
+        topping_order, topping_ids = array('q'), array('q')
+        count = 0
+        for order_number, order in enumerate(orders):
+            count += 1
+            for drink_id, size_id, toppings in order:
+                line_order.append(order_number)
+                drink_ids.append(drink_id)
+                size_ids.append(size_id)
+                for topping_id in toppings:
+                    topping_order.append(order_number)
+                    topping_ids.append(topping_id)
+        self.count = count
+        self.line_order = np.frombuffer(line_order, dtype=np.int64)
+        self.drink_ids = np.frombuffer(drink_ids, dtype=np.int64)
+        self.size_ids = np.frombuffer(size_ids, dtype=np.int64)
+        self.topping_order = np.frombuffer(topping_order, dtype=np.int64)
+        self.topping_ids = np.frombuffer(topping_ids, dtype=np.int64)
+
+
+@lru_cache(maxsize=16)
+def _compiled(drinks, sizes, toppings):
+    return PriceTable(dict(drinks), dict(sizes), dict(toppings))
+
+
+# the PriceTable for this version of the menus, compiled once per version
+def price_table(drinks_menu, size_menu, toppings_menu):
+    return _compiled(tuple(drinks_menu.items()), tuple(size_menu.items()),
+                     tuple(toppings_menu.items()))
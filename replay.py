@@ -0,0 +1,188 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from BubbleTeaChatboy import BTBot
+from sessions import SessionEngine
+import geo
+import metrics
+import parsecache
+import stores
+
+# Replays scripted conversations through BTBot without a terminal, checks what
+# the bot ordered and said, and reports how fast it was. Each line of a
+# transcript file is one conversation:
+#   {"id": "two-drinks",
+#    "turns": ["Bill", "I want a large stormy pouf ...", "checkout", ...],
+#    "expect": {"orders": [{"name": "stormy pouf", "size": "large",
+#                           "toppings": ["red bean"], "sugar": "less",
+#                           "ice": "normal"}],
+#               "replies": ["Confirmed!"], "finished": true}}
+# Every "expect" entry is optional. Delivery times come from the local FSA
+# fixture instead of the real geocoder, with every store open (REPLAY_TIME).
+
+REPLAY_TIME = datetime.datetime(2026, 1, 5, 12, 30)
+
+
+# BTBot that counts how many utterances it has matched to an intent, so each
+# turn can be attributed to the intent it triggered
+class ReplayBot(BTBot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.matched = 0
+
+    async def match_reply(self, *args, **kwargs):
+        self.matched += 1
+        return await super().match_reply(*args, **kwargs)
+
+
+class Replay:
+    def __init__(self, geocoder=None, track_memory=False, profile_dir=None,
+                 stores_registry=None):
+        self.geocoder = geocoder or geo.load_fixture()
+        self.stores = stores_registry or stores.StoreRegistry.load(
+            clock=lambda: REPLAY_TIME)
+        self.engine = SessionEngine(self.make_bot)
+        self.track_memory = track_memory
+        self.profile_dir = profile_dir # one cProfile dump per session
+        self.latencies = {} # intent -> listof seconds
+        self.memory = []    # peak bytes per session
+        self.failures = []  # (transcript id, message)
+        self.turns = 0
+
+    def make_bot(self, transport):
+        return ReplayBot(transport, geocoder=self.geocoder, stores=self.stores)
+
+    # dictof Str: Any -> None
+    async def play(self, transcript):
+        name = transcript.get("id", f"transcript {self.engine.completed + 1}")
+        if self.track_memory:
+            tracemalloc.start()
+        transport = self.engine.open_memory_session(name)
+        said = await transport.replies()
+        bot = self.engine.sessions[name]
+        for number, text in enumerate(transcript["turns"]):
+            if transport.closed:
+                self.failures.append((name, f"conversation ended before "
+                                            f"turn {number + 1}: {text!r}"))
+                break
+            matched = bot.matched
+            start = time.perf_counter()
+            said += await transport.turn(text)
+            elapsed = time.perf_counter() - start
+            if number == 0:
+                intent = "greet"
+            elif bot.matched == matched:
+                intent = "answer" # to a question the bot asked
+            else:
+                intent = str(bot.last_intent)
+            self.latencies.setdefault(intent, []).append(elapsed)
+            self.turns += 1
+        if not transport.closed:
+            transport.hang_up()
+            await transport.replies()
+        if self.track_memory:
+            self.memory.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        self.check(name, transcript.get("expect", {}), bot, said)
+
+    def check(self, name, expect, bot, said):
+        if "orders" in expect:
+            ordered = [drink.as_record() for drink in bot.order_items]
+            if ordered != expect["orders"]:
+                self.failures.append((name, f"ordered {ordered}, "
+                                            f"expected {expect['orders']}"))
+        transcript = "\n".join(said)
+        for reply in expect.get("replies", []):
+            if reply not in transcript:
+                self.failures.append((name, f"never said {reply!r}"))
+        if "finished" in expect and bot.finished != expect["finished"]:
+            self.failures.append((name, f"finished is {bot.finished}"))
+
+    # listof dictof Str: Any -> Float
+    # plays every transcript in turn, returning the seconds taken
+    async def play_all(self, transcripts):
+        start = time.perf_counter()
+        for number, transcript in enumerate(transcripts):
+            if self.profile_dir:
+                name = transcript.get("id", "transcript")
+                path = os.path.join(self.profile_dir, f"{number}-{name}.prof")
+                with metrics.profiled(path):
+                    await self.play(transcript)
+            else:
+                await self.play(transcript)
+        return time.perf_counter() - start
+
+    def report(self, elapsed, out=sys.stdout):
+        sessions = (self.engine.completed + self.engine.dropped
+                    + self.engine.failed)
+        print(f"{sessions} sessions, {self.turns} turns in {elapsed:.3f}s "
+              f"({self.turns / elapsed:,.0f} turns/sec)", file=out)
+        print(f"{'intent':20} {'turns':>6} {'mean ms':>9} {'max ms':>9}",
+              file=out)
+        for intent, latencies in sorted(self.latencies.items()):
+            print(f"{intent:20} {len(latencies):6} "
+                  f"{sum(latencies) / len(latencies) * 1e3:9.3f} "
+                  f"{max(latencies) * 1e3:9.3f}", file=out)
+        cache = parsecache.shared_cache.stats()
+        print(f"parse cache: {cache['hits']} hits, {cache['misses']} misses "
+              f"({cache['hit_rate']:.0%}), {cache['evictions']} evictions",
+              file=out)
+        if self.memory:
+            print(f"peak memory per session: "
+                  f"{sum(self.memory) / len(self.memory) / 1024:.1f} KiB mean, "
+                  f"{max(self.memory) / 1024:.1f} KiB max", file=out)
+        for name, message in self.failures:
+            print(f"FAIL {name}: {message}", file=out)
+        if not self.failures:
+            print("all transcripts passed", file=out)
+
+
+# Str -> iterable of dictof Str: Any
+def read_transcripts(path):
+    with open(path) as lines:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay scripted conversations through BTBot.")
+    parser.add_argument("paths", nargs="+", help="transcript JSONL files")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="play every transcript this many times")
+    parser.add_argument("--memory", action="store_true",
+                        help="measure peak memory per session (slower)")
+    parser.add_argument("--metrics-json", metavar="PATH",
+                        help="write per-stage timings as JSON")
+    parser.add_argument("--metrics-prom", metavar="PATH",
+                        help="write per-stage timings in Prometheus format")
+    parser.add_argument("--sample-rate", type=float, default=1.0,
+                        help="fraction of calls to time")
+    parser.add_argument("--profile-dir", metavar="DIR",
+                        help="dump a cProfile of each session into DIR")
+    args = parser.parse_args()
+    if args.metrics_json or args.metrics_prom:
+        metrics.configure(sample_rate=args.sample_rate)
+    if args.profile_dir:
+        os.makedirs(args.profile_dir, exist_ok=True)
+    transcripts = [transcript for path in args.paths
+                   for transcript in read_transcripts(path)] * args.repeat
+    replay = Replay(track_memory=args.memory, profile_dir=args.profile_dir)
+    elapsed = asyncio.run(replay.play_all(transcripts))
+    replay.report(elapsed)
+    if args.metrics_json:
+        metrics.registry.write_json(args.metrics_json)
+    if args.metrics_prom:
+        metrics.registry.write_prometheus(args.metrics_prom)
+    sys.exit(1 if replay.failures else 0)
+
+
+if __name__ == "__main__":
+    main()
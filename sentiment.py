@@ -0,0 +1,127 @@
+import argparse
+import json
+import sys
+
+from chunked import map_chunks
+
+# Sentiment scoring for customer feedback. One VADER analyzer is shared by the
+# whole process (building one re-reads the lexicon from disk), and feedback
+# archives can be re-scored in bulk with score_feedback.
+
+POSITIVE = 0.05  # VADER's usual compound score cut-offs
+NEGATIVE = -0.05
+BINS = 20        # histogram buckets per score
+
+_analyzer = None
+
+# the process-wide SentimentIntensityAnalyzer, built on first use
+def analyzer():
+    global _analyzer
+    if _analyzer is None:
+        from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+# Str -> dictof Str: Float
+def polarity_scores(text):
+    return analyzer().polarity_scores(text)
+
+
+# Float -> Str
+def label(compound):
+    if compound >= POSITIVE:
+        return "pos"
+    elif compound <= NEGATIVE:
+        return "neg"
+    return "neutral"
+
+
+class FeedbackSummary:
+    def __init__(self, bins=BINS):
+        self.counts = {"pos": 0, "neg": 0, "neutral": 0}
+        self.histograms = {key: [0] * bins
+                           for key in ("compound", "pos", "neg", "neu")}
+        self.bins = bins
+
+    # dictof Str: Float -> None
+    def add(self, score):
+        self.counts[label(score['compound'])] += 1
+        for key, histogram in self.histograms.items():
+            low = -1 if key == "compound" else 0
+            bucket = int((score[key] - low) / (1 - low) * self.bins)
+            histogram[min(max(bucket, 0), self.bins - 1)] += 1
+
+    # FeedbackSummary -> None
+    def merge(self, other):
+        for key in self.counts:
+            self.counts[key] += other.counts[key]
+        for key, histogram in self.histograms.items():
+            for i, count in enumerate(other.histograms[key]):
+                histogram[i] += count
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def as_dict(self):
+        return {"total": self.total, "counts": self.counts,
+                "histograms": self.histograms}
+
+
+# listof Str -> FeedbackSummary
+def _score_chunk(texts):
+    summary = FeedbackSummary()
+    for text in texts:
+        summary.add(polarity_scores(text))
+    return summary
+
+
+# iterable of Str -> iterable of Str
+# the feedback text of each JSONL record; records are either plain JSON
+# strings or objects with the text under field
+def parse_feedback(lines, field="feedback"):
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        yield record if isinstance(record, str) else record.get(field, "")
+
+
+# Str -> iterable of Str
+def read_feedback(path, field="feedback"):
+    with open(path) as lines:
+        yield from parse_feedback(lines, field)
+
+
+# iterable of Str -> FeedbackSummary
+# scores feedback in chunks of chunk_size, across processes worker processes
+# if given; arbitrarily large inputs can be streamed through (see chunked)
+def score_feedback(texts, chunk_size=1000, processes=None):
+    summary = FeedbackSummary()
+    for scored in map_chunks(_score_chunk, texts, chunk_size, processes,
+                             initializer=analyzer):
+        summary.merge(scored)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Score collected feedback (JSONL) with VADER.")
+    parser.add_argument("path", help="JSONL file, or - for stdin")
+    parser.add_argument("--field", default="feedback",
+                        help="record field holding the feedback text")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    if args.path == "-":
+        texts = parse_feedback(sys.stdin, args.field)
+    else:
+        texts = read_feedback(args.path, args.field)
+    summary = score_feedback(texts, args.chunk_size, args.processes)
+    json.dump(summary.as_dict(), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import argparse
+import asyncio
+import functools
+import itertools
+import os
+import random
+import sys
+import traceback
+
+from BubbleTeaChatboy import BTBot, SessionIdle, warmup
+import metrics
+from orderlog import OrderLog
+from sessionstore import SessionStore
+from transports import (LOST, MemoryTransport, SocketTransport,
+                        StdioTransport)
+
+# Runs many conversations in one process. Each conversation is its own BTBot
+# with its own state, driven as an asyncio task over its own transport. Given
+# a SessionStore, a conversation left idle at the chat prompt for longer than
+# idle_timeout seconds is saved there and its bot dropped; the customer's
+# next message brings it back with a fresh bot. Only the bot goes: the
+# session's task stays parked on its transport, and the transport stays for
+# as long as the customer is connected, so a spilled session still costs
+# the connection plus a small task (see benchmarks/bench_session_memory.py).
+# Given a profile_dir, a profile_rate fraction of sessions are profiled, each
+# into its own cProfile dump. A conversation that fails with an unexpected
+# error is logged to stderr and counted as failed, and its customer is told
+# before the transport closes; the other conversations carry on.
+
+
+class SessionEngine:
+    def __init__(self, bot_factory=BTBot, store=None, idle_timeout=60,
+                 profile_dir=None, profile_rate=1.0):
+        self.bot_factory = bot_factory
+        self.store = store
+        self.idle_timeout = idle_timeout
+        self.profile_dir = profile_dir # one cProfile dump per sampled session
+        self.profile_rate = profile_rate
+        self.sessions = {} # session id -> BTBot, for conversations in memory
+        self.session_ids = itertools.count(1)
+        self.completed = 0
+        self.dropped = 0   # customers who left mid-conversation
+        self.failed = 0    # conversations ended by an unexpected error
+        self.spilled = 0   # times a conversation was saved to the store
+        self.rehydrated = 0
+
+    def _start_bot(self, transport, session_id):
+        bot = self.bot_factory(transport)
+        if self.store is not None:
+            bot.idle_timeout = self.idle_timeout
+        self.sessions[session_id] = bot
+        return bot
+
+    # runs one whole conversation over transport
+    async def run_session(self, transport, session_id=None):
+        if session_id is None:
+            session_id = next(self.session_ids)
+        conversation = self._converse(transport, session_id)
+        if self.profile_dir and random.random() < self.profile_rate:
+            path = os.path.join(self.profile_dir, f"session-{session_id}.prof")
+            conversation = metrics.profiled_task(conversation, path)
+        await conversation
+
+    async def _converse(self, transport, session_id):
+        bot = self._start_bot(transport, session_id)
+        conversation = bot.greet()
+        try:
+            while True:
+                try:
+                    await conversation
+                    break
+                except SessionIdle:
+                    pass
+                # outside the except block, so nothing keeps the bot alive
+                self.store.save(session_id, bot.state())
+                del self.sessions[session_id]
+                bot = conversation = None
+                self.spilled += 1
+                try:
+                    await transport.wait_readable()
+                except (EOFError, ConnectionError):
+                    self.store.discard(session_id) # the customer left
+                    raise
+                bot = self._start_bot(transport, session_id)
+                bot.restore(self.store.take(session_id))
+                self.rehydrated += 1
+                conversation = bot.chat(resumed=True)
+            self.completed += 1
+        except (EOFError, ConnectionError):
+            self.dropped += 1
+        except Exception:
+            self.failed += 1
+            print(f"session {session_id} failed:", file=sys.stderr)
+            traceback.print_exc()
+            try:
+                await transport.send(LOST)
+            except ConnectionError:
+                pass
+        finally:
+            self.sessions.pop(session_id, None)
+            await transport.close()
+
+    # -> MemoryTransport
+    # starts a conversation with an in-process customer, returning the
+    # customer's end of it
+    def open_memory_session(self, session_id=None):
+        transport = MemoryTransport()
+        asyncio.get_running_loop().create_task(
+            self.run_session(transport, session_id))
+        return transport
+
+    async def handle_connection(self, reader, writer):
+        await self.run_session(SocketTransport(reader, writer))
+
+    # writes the metrics registry to path in Prometheus format every interval
+    # seconds
+    async def export_metrics(self, path, interval=10):
+        while True:
+            await asyncio.sleep(interval)
+            metrics.registry.write_prometheus(path)
+
+    # serves one conversation per connection on a Unix socket at path, or on
+    # a local TCP port
+    async def serve(self, path=None, host="127.0.0.1", port=8765,
+                    metrics_path=None):
+        if metrics_path:
+            asyncio.get_running_loop().create_task(
+                self.export_metrics(metrics_path))
+        if path:
+            server = await asyncio.start_unix_server(self.handle_connection,
+                                                     path)
+        else:
+            server = await asyncio.start_server(self.handle_connection,
+                                                host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve BTBot conversations. With no options, chat in the "
+                    "terminal.")
+    parser.add_argument("--unix", metavar="PATH",
+                        help="serve on a Unix socket at PATH")
+    parser.add_argument("--port", type=int,
+                        help="serve on this local TCP port")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--warmup", action="store_true",
+                        help="load NLP models and the geocoder before serving, "
+                             "building the FSA table if it is missing")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="time each stage and export to PATH "
+                             "(Prometheus text format)")
+    parser.add_argument("--sample-rate", type=float, default=1.0,
+                        help="fraction of calls to time")
+    parser.add_argument("--order-log", metavar="PATH",
+                        help="append confirmed orders to PATH (JSONL)")
+    parser.add_argument("--idle-timeout", type=float, metavar="SECONDS",
+                        help="move conversations idle this long at the chat "
+                             "prompt out of memory")
+    parser.add_argument("--spill", metavar="PATH", default=":memory:",
+                        help="SQLite file for idle conversations")
+    parser.add_argument("--profile-dir", metavar="DIR",
+                        help="dump a cProfile of each sampled session into DIR")
+    parser.add_argument("--profile-rate", type=float, default=1.0,
+                        help="fraction of sessions to profile")
+    args = parser.parse_args()
+    if args.profile_dir:
+        os.makedirs(args.profile_dir, exist_ok=True)
+    if args.metrics:
+        metrics.configure(sample_rate=args.sample_rate)
+    if args.warmup:
+        warmup()
+    order_log = OrderLog(args.order_log) if args.order_log else None
+    store = SessionStore(args.spill) if args.idle_timeout else None
+    engine = SessionEngine(functools.partial(BTBot, order_log=order_log),
+                           store, args.idle_timeout, args.profile_dir,
+                           args.profile_rate)
+    try:
+        if args.unix or args.port:
+            asyncio.run(engine.serve(args.unix, args.host, args.port,
+                                     args.metrics))
+        else:
+            asyncio.run(engine.run_session(StdioTransport()))
+    finally:
+        if order_log:
+            order_log.close()
+
+
+if __name__ == "__main__":
+    main()
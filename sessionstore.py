@@ -0,0 +1,119 @@
+import json
+import sqlite3
+from array import array
+
+from parsecache import DrinkTemplate
+
+# Where idle conversations wait for the customer's next turn. A conversation
+# at rest is a small dict of state plus its order, and the order is packed as
+# a run of small integers: every name is replaced by its id in the menu's
+# PriceTable, so a drink line costs a few bytes instead of a Drink object and
+# a list of strings.
+#
+# A packed drink line is
+#   drink id, size id, sugar, ice, topping count, topping id...
+# with -1 for a missing name, size or level, -2 for a level of None, and
+# NOTHING as the topping id of "nothing".
+
+LEVELS = ("less", "normal", "more")
+NOTHING = -1
+
+
+# Str or None, dictof Str: Int -> Int
+def _id(value, ids):
+    return -1 if value is None else ids[value]
+
+
+# Str, Int or None -> Int
+def _level_id(level):
+    if level is None:
+        return -2
+    if level == -1:
+        return -1
+    return LEVELS.index(level)
+
+
+# Int -> Str, Int or None
+def _level(level_id):
+    if level_id == -2:
+        return None
+    if level_id == -1:
+        return -1
+    return LEVELS[level_id]
+
+
+# listof Drink, PriceTable -> bytes
+def pack_drinks(drinks, prices):
+    packed = array('h')
+    for drink in drinks:
+        packed.extend((_id(drink.name, prices.drink_ids),
+                       _id(drink.size or None, prices.size_ids),
+                       _level_id(drink.sugar), _level_id(drink.ice),
+                       len(drink.toppings)))
+        packed.extend(NOTHING if topping == "nothing"
+                      else prices.topping_ids[topping]
+                      for topping in drink.toppings)
+    return packed.tobytes()
+
+
+# bytes, PriceTable -> listof DrinkTemplate
+def unpack_drinks(data, prices):
+    packed = array('h')
+    packed.frombytes(data)
+    names = list(prices.drink_ids)
+    sizes = list(prices.size_ids)
+    toppings = list(prices.topping_ids)
+    drinks = []
+    position = 0
+    while position < len(packed):
+        name, size, sugar, ice, count = packed[position:position + 5]
+        position += 5
+        drinks.append(DrinkTemplate(
+            names[name] if name >= 0 else None,
+            tuple("nothing" if topping == NOTHING else toppings[topping]
+                  for topping in packed[position:position + count]),
+            sizes[size] if size >= 0 else None,
+            _level(sugar), _level(ice)))
+        position += count
+    return drinks
+
+
+class SessionStore:
+    # Str: an SQLite database file, by default one in memory. Spilled
+    # sessions are scratch data, so writes are not synced to disk.
+    def __init__(self, path=":memory:"):
+        self.db = sqlite3.connect(path, isolation_level=None)
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("CREATE TABLE IF NOT EXISTS sessions "
+                        "(id TEXT PRIMARY KEY, state TEXT, order_lines BLOB)")
+
+    # Any, dictof Str: Any -> None
+    # state as from BTBot.state()
+    def save(self, session_id, state):
+        state = dict(state)
+        order = state.pop("order")
+        self.db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                        (str(session_id), json.dumps(state), order))
+
+    # Any -> dictof Str: Any
+    # the state saved for session_id, removing it from the store
+    def take(self, session_id):
+        row = self.db.execute("SELECT state, order_lines FROM sessions "
+                              "WHERE id = ?", (str(session_id),)).fetchone()
+        if row is None:
+            raise KeyError(session_id)
+        self.db.execute("DELETE FROM sessions WHERE id = ?", (str(session_id),))
+        state = json.loads(row[0])
+        state["order"] = row[1]
+        return state
+
+    # Any -> None
+    # forgets session_id, if saved
+    def discard(self, session_id):
+        self.db.execute("DELETE FROM sessions WHERE id = ?", (str(session_id),))
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self):
+        self.db.close()
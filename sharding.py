@@ -0,0 +1,346 @@
+import argparse
+import asyncio
+import functools
+import itertools
+import multiprocessing
+import os
+import zlib
+
+from transports import LOST
+
+# Runs conversations on several cores. One BTBot process spends most of its
+# time in spelling correction, tokenizing and sentiment, all under the GIL, so
+# a Dispatcher hands conversations out to a pool of worker processes, each a
+# SessionEngine with its own warmed caches. A session always goes to the same
+# worker (by crc32 of its id), so its bot, its cached parses and anything the
+# worker's SessionStore holds for it stay in one place.
+#
+# The dispatcher and each worker talk over a multiprocessing Pipe, one message
+# per tuple:
+#   dispatcher -> worker: ("open", id), ("line", id, Str), ("hangup", id)
+#   worker -> dispatcher: ("say", id, Str), ("ready", id), ("end", id)
+# "ready" means the bot is waiting for the customer; "end" means the
+# conversation is over. A message the dispatcher sends holds one of the
+# worker's max_pending slots until the worker answers it with "ready" or
+# "end", so a busy worker stops the dispatcher reading from its customers
+# rather than letting the pipe and the worker's queues fill up. A worker that
+# dies takes its conversations with it: their customers are told and
+# disconnected, and a new worker takes its place in the shard map.
+
+
+# Connection, dictof Str: Any -> None
+# a worker process: serves the sessions the dispatcher sends down conn until
+# the dispatcher closes its end
+def _worker_main(conn, options):
+    from BubbleTeaChatboy import BTBot, warmup
+    from orderlog import OrderLog
+    from sessions import SessionEngine
+    from sessionstore import SessionStore
+
+    warmup(geocoder=options["warmup"])
+    order_log = (OrderLog(options["order_log"]) if options["order_log"]
+                 else None)
+    store = (SessionStore(options["spill"]) if options["idle_timeout"]
+             else None)
+    engine = SessionEngine(functools.partial(BTBot, order_log=order_log),
+                           store, options["idle_timeout"],
+                           options["profile_dir"], options["profile_rate"])
+    try:
+        asyncio.run(_serve_pipe(conn, engine))
+    finally:
+        if order_log:
+            order_log.close()
+
+
+async def _serve_pipe(conn, engine):
+    from transports import PipeTransport
+
+    loop = asyncio.get_running_loop()
+    transports = {} # session id -> PipeTransport
+    closed = loop.create_future()
+
+    def received():
+        while conn.poll():
+            try:
+                kind, session_id, *text = conn.recv()
+            except EOFError:
+                loop.remove_reader(conn.fileno())
+                closed.set_result(None)
+                return
+            if kind == "open":
+                transport = transports[session_id] = PipeTransport(conn,
+                                                                   session_id)
+                task = loop.create_task(engine.run_session(transport,
+                                                           session_id))
+                task.add_done_callback(
+                    lambda _, session_id=session_id:
+                    transports.pop(session_id, None))
+            elif kind == "line":
+                transports[session_id].inbox.put_nowait(text[0])
+            elif kind == "hangup":
+                transports[session_id].hang_up()
+
+    loop.add_reader(conn.fileno(), received)
+    await closed
+
+
+class Worker:
+    def __init__(self, index, process, conn, max_pending):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.max_pending = max_pending
+        self.slots = asyncio.Semaphore(max_pending)
+        self.sessions = 0   # sessions routed here
+        self.active = set() # ids of its conversations in progress
+        self.alive = True
+        self.dead = asyncio.get_running_loop().create_future()
+
+    # (Str, Any, ...) -> None
+    # sends message once a slot is free; raises ConnectionError if the
+    # worker is dead
+    async def send(self, message):
+        await self.slots.acquire()
+        if not self.alive:
+            raise ConnectionError(f"worker {self.index} died")
+        self.conn.send(message)
+
+    # marks the worker dead, waking every send() waiting for a slot and every
+    # session waiting for its customer
+    def died(self):
+        self.alive = False
+        self.dead.set_result(None)
+        for _ in range(self.max_pending + len(self.active)):
+            self.slots.release()
+
+
+class Dispatcher:
+    # Int: worker processes, by default one per core; Int: messages each
+    # worker may have in hand at once; warmup: also load the geocoder in each
+    # worker; order_log, spill: paths, suffixed with the worker number since
+    # every worker keeps its own; profile_dir, profile_rate: as for
+    # SessionEngine, shared by the workers as session ids are unique
+    def __init__(self, workers=None, max_pending=64, warmup=False,
+                 order_log=None, idle_timeout=None, spill=":memory:",
+                 profile_dir=None, profile_rate=1.0):
+        self.count = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.options = {"warmup": warmup, "order_log": order_log,
+                        "idle_timeout": idle_timeout, "spill": spill,
+                        "profile_dir": profile_dir,
+                        "profile_rate": profile_rate}
+        self.workers = []
+        self.sessions = {} # session id -> asyncio.Queue of worker messages
+        self.session_ids = itertools.count(1)
+        self.ended = 0 # conversations over, finished or abandoned
+        self.lost = 0  # of those, ended by their worker dying
+
+    # Str -> Str or None
+    def _worker_path(self, path, index):
+        if path is None or path == ":memory:":
+            return path
+        return f"{path}.{index}"
+
+    # starts the worker processes and reads from them on the running loop.
+    # With warmup, the FSA table is built here first if missing, once rather
+    # than by every worker.
+    def start(self):
+        if self.options["warmup"]:
+            from geo import ensure_fsa_index
+            ensure_fsa_index()
+        self.workers = [self._spawn(index) for index in range(self.count)]
+
+    # Int -> Worker
+    # a new worker process for shard index. Workers are spawned rather than
+    # forked, so none inherits the running loop or another worker's end of a
+    # pipe.
+    def _spawn(self, index):
+        context = multiprocessing.get_context("spawn")
+        options = dict(self.options,
+                       order_log=self._worker_path(self.options["order_log"],
+                                                   index),
+                       spill=self._worker_path(self.options["spill"], index))
+        ours, theirs = context.Pipe()
+        process = context.Process(target=_worker_main, args=(theirs, options),
+                                  name=f"btbot-worker-{index}", daemon=True)
+        process.start()
+        theirs.close()
+        worker = Worker(index, process, ours, self.max_pending)
+        asyncio.get_running_loop().add_reader(ours.fileno(), self._received,
+                                              worker)
+        return worker
+
+    # closes the pipes, which ends the workers, and waits for them
+    def stop(self, timeout=5):
+        loop = asyncio.get_running_loop()
+        for worker in self.workers:
+            loop.remove_reader(worker.conn.fileno())
+            worker.conn.close()
+        for worker in self.workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        self.workers = []
+
+    # Any -> Worker
+    # the worker every message of session_id goes to
+    def worker_for(self, session_id):
+        shard = zlib.crc32(str(session_id).encode()) % len(self.workers)
+        return self.workers[shard]
+
+    def _received(self, worker):
+        while worker.conn.poll():
+            try:
+                kind, session_id, *text = worker.conn.recv()
+            except (EOFError, ConnectionError):
+                # the worker died, cleanly or with messages unread
+                self._replace(worker)
+                return
+            if kind != "say":
+                worker.slots.release()
+            events = self.sessions.get(session_id)
+            if events is not None:
+                events.put_nowait((kind, text[0] if text else None))
+
+    # Worker -> None
+    # ends the conversations of a worker that died and starts another in its
+    # place
+    def _replace(self, worker):
+        asyncio.get_running_loop().remove_reader(worker.conn.fileno())
+        worker.conn.close()
+        worker.died()
+        for session_id in worker.active:
+            events = self.sessions.get(session_id)
+            if events is not None:
+                events.put_nowait(("lost", None))
+        worker.process.join(1)
+        if self.workers[worker.index] is worker:
+            self.workers[worker.index] = self._spawn(worker.index)
+
+    # relays one whole conversation between transport, the customer's end,
+    # and the worker running its bot
+    async def run_session(self, transport, session_id=None):
+        if session_id is None:
+            session_id = next(self.session_ids)
+        worker = self.worker_for(session_id)
+        worker.sessions += 1
+        worker.active.add(session_id)
+        events = self.sessions[session_id] = asyncio.Queue()
+        gone = False # the customer left
+        try:
+            try:
+                await worker.send(("open", session_id))
+            except ConnectionError:
+                events.put_nowait(("lost", None))
+            while True:
+                kind, text = await events.get()
+                if kind == "end":
+                    break
+                if kind == "lost":
+                    self.lost += 1
+                    if not gone:
+                        try:
+                            await transport.send(LOST)
+                        except ConnectionError:
+                            pass
+                    break
+                if kind == "say":
+                    if not gone:
+                        try:
+                            await transport.send(text)
+                        except ConnectionError:
+                            gone = True
+                    continue
+                try:
+                    if gone:
+                        raise EOFError
+                    receiving = asyncio.ensure_future(transport.receive())
+                    await asyncio.wait((receiving, worker.dead),
+                                       return_when=asyncio.FIRST_COMPLETED)
+                    if not receiving.done():
+                        receiving.cancel()
+                        events.put_nowait(("lost", None))
+                        continue
+                    message = ("line", session_id, receiving.result())
+                except (EOFError, ConnectionError):
+                    gone = True
+                    message = ("hangup", session_id)
+                try:
+                    await worker.send(message)
+                except ConnectionError:
+                    events.put_nowait(("lost", None))
+            self.ended += 1
+        finally:
+            del self.sessions[session_id]
+            worker.active.discard(session_id)
+            await transport.close()
+
+    # -> MemoryTransport
+    # starts a conversation with an in-process customer, returning the
+    # customer's end of it
+    def open_memory_session(self, session_id=None):
+        from transports import MemoryTransport
+        transport = MemoryTransport()
+        asyncio.get_running_loop().create_task(
+            self.run_session(transport, session_id))
+        return transport
+
+    async def handle_connection(self, reader, writer):
+        from transports import SocketTransport
+        await self.run_session(SocketTransport(reader, writer))
+
+    # serves one conversation per connection on a Unix socket at path, or on
+    # a local TCP port
+    async def serve(self, path=None, host="127.0.0.1", port=8765):
+        self.start()
+        try:
+            if path:
+                server = await asyncio.start_unix_server(
+                    self.handle_connection, path)
+            else:
+                server = await asyncio.start_server(self.handle_connection,
+                                                    host, port)
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve BTBot conversations from a pool of worker "
+                    "processes.")
+    parser.add_argument("--unix", metavar="PATH",
+                        help="serve on a Unix socket at PATH")
+    parser.add_argument("--port", type=int, default=8765,
+                        help="serve on this local TCP port")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--workers", type=int,
+                        help="worker processes (default: one per core)")
+    parser.add_argument("--max-pending", type=int, default=64,
+                        help="messages each worker may have in hand at once")
+    parser.add_argument("--warmup", action="store_true",
+                        help="load the geocoder in each worker before serving")
+    parser.add_argument("--order-log", metavar="PATH",
+                        help="append confirmed orders to PATH.N (JSONL), "
+                             "N being the worker number")
+    parser.add_argument("--idle-timeout", type=float, metavar="SECONDS",
+                        help="move conversations idle this long at the chat "
+                             "prompt out of memory")
+    parser.add_argument("--spill", metavar="PATH", default=":memory:",
+                        help="SQLite file for idle conversations, as PATH.N")
+    parser.add_argument("--profile-dir", metavar="DIR",
+                        help="dump a cProfile of each sampled session into DIR")
+    parser.add_argument("--profile-rate", type=float, default=1.0,
+                        help="fraction of sessions to profile")
+    args = parser.parse_args()
+    if args.profile_dir:
+        os.makedirs(args.profile_dir, exist_ok=True)
+    dispatcher = Dispatcher(args.workers, args.max_pending, args.warmup,
+                            args.order_log, args.idle_timeout, args.spill,
+                            args.profile_dir, args.profile_rate)
+    asyncio.run(dispatcher.serve(args.unix, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# Filling in whatever the customer left out of an order, for every drink of
+# the order at once. A SlotFiller never talks to anyone: it says which slots
+# are missing and what to ask, and applies the customer's answer, so that a
+# single answer like "all large, less ice, normal sugar, no toppings" can
+# finish a whole order in one turn. The bot does the asking.
+
+SLOTS = ("name", "size", "toppings", "ice", "sugar") # in the order asked for
+ASKED_AS = {"name": "drink"} # how a slot is named in a question
+LEVELS = ("less", "normal", "more") # for ice and sugar
+NO_TOPPINGS = ("no", "nothing", "none", "without")
+EVERY_DRINK = ("all", "both", "every") # back to answering for every drink
+
+
+class SlotFiller:
+    # listof Drink, MenuSnapshot
+    def __init__(self, drinks, menu):
+        self.drinks = list(drinks)
+        self.menu = menu
+        self.sizes = tuple(sorted(menu.sizes, key=menu.sizes.get))
+        # "nothing" as toppings is also what a drink starts with, so whether
+        # the toppings have been settled is tracked here, by drink position
+        self.toppings_resolved = {position for position, drink
+                                  in enumerate(self.drinks)
+                                  if drink.toppings not in (["nothing"], None, [])}
+
+    # Int, Str -> Bool
+    def is_missing(self, position, slot):
+        drink = self.drinks[position]
+        if slot == "name":
+            return drink.name is None
+        if slot == "size":
+            return not drink.size
+        if slot == "toppings":
+            return position not in self.toppings_resolved
+        return getattr(drink, slot) in (-1, None)
+
+    # -> dictof Str: listof Int
+    # the positions of the drinks missing each slot; slots nothing is
+    # missing are left out
+    def missing(self):
+        missing = {}
+        for slot in SLOTS:
+            positions = [position for position in range(len(self.drinks))
+                         if self.is_missing(position, slot)]
+            if positions:
+                missing[slot] = positions
+        return missing
+
+    # -> Bool
+    def complete(self):
+        return not self.missing()
+
+    # -> Str
+    # one question asking for every missing slot of every drink
+    def prompt(self):
+        missing = self.missing()
+        if not missing:
+            return ""
+        asked = [ASKED_AS.get(slot, slot) for slot in missing]
+        positions = sorted({position for positions in missing.values()
+                            for position in positions})
+        names = [f"the {self._called(self.drinks[position])}"
+                 for position in positions]
+        question = (f"What {_listed(asked)} would you like for "
+                    f"{_listed(names)}?")
+        hints = []
+        if "name" in missing:
+            hints.append("ask for the menu to see our drinks")
+        if "size" in missing:
+            hints.append(f"sizes are {_listed(self.sizes, 'or')}")
+        if "ice" in missing or "sugar" in missing:
+            levels = [slot for slot in ("ice", "sugar") if slot in missing]
+            hints.append(f"{' and '.join(levels)} can be "
+                         f"{_listed(LEVELS, 'or')}")
+        if "toppings" in missing:
+            hints.append("you can also say no toppings")
+        answer = "You can answer for everything at once"
+        if len(positions) > 1:
+            answer += (', like "all large, less ice", or name a drink to '
+                       "answer just for it")
+        return f"{question} ({'; '.join(hints)}.) {answer}.\n"
+
+    # listof Str -> listof Str
+    # applies an answer, given as its cleaned-up words, to the drinks missing
+    # the slots it fills, returning the slots it filled. Words before any
+    # drink name apply to every drink; words after a drink name apply only
+    # to drinks of that name, until "all", "both" or "every" makes them
+    # apply to every drink again. Words just before "for (the)" and a drink
+    # name apply to drinks of that name, and the words after them to every
+    # drink. A drink name no drink has yet is instead the name of the drinks
+    # without one. A value given once applies to every drink missing it, and
+    # values given in turn ("large and small") go to the drinks in order.
+    def fill(self, words):
+        filled = []
+        for positions, values in self._segments(list(words)):
+            for slot in SLOTS:
+                if slot not in values:
+                    continue
+                targets = [position for position in positions
+                           if self.is_missing(position, slot)]
+                given = values[slot]
+                if len(given) == 1:
+                    given = given * len(targets)
+                for position, value in zip(targets, given):
+                    self._set(position, slot, value)
+                    if slot not in filled:
+                        filled.append(slot)
+        return filled
+
+    # Drink -> Str
+    # what to call drink in a question, e.g. "stormy pouf" or "large drink"
+    def _called(self, drink):
+        if drink.name:
+            return drink.name
+        return f"{drink.size} drink" if drink.size else "drink"
+
+    def _set(self, position, slot, value):
+        drink = self.drinks[position]
+        if slot == "toppings":
+            drink.toppings = list(value)
+            self.toppings_resolved.add(position)
+        else:
+            setattr(drink, slot, value)
+
+    # listof Str -> iterable of (listof Int, dictof Str: listof Any)
+    # the answer split at drink names into the drinks each part is about and
+    # the slot values it gives
+    def _segments(self, words):
+        everyone = list(range(len(self.drinks)))
+        positions, values = everyone, {}
+        level, refused = None, False
+        claimed = False # the last words were "for" or "for the"
+        for match in self.menu.index.scan(words):
+            word, item = match.word, match.item
+            if item and item.kind == "drink":
+                named = [position for position, drink
+                         in enumerate(self.drinks) if drink.name == item.name]
+                if not named:
+                    values.setdefault("name", []).append(item.name)
+                    continue
+                values = _settled(values, level, refused)
+                if claimed:
+                    # "less ice for the stormy pouf": the words before are
+                    # about it, and the words after about every drink again
+                    if values:
+                        yield named, values
+                    positions = everyone
+                else:
+                    if values:
+                        yield positions, values
+                    positions = named
+                values, level, refused, claimed = {}, None, False, False
+                continue
+            if word in EVERY_DRINK:
+                values = _settled(values, level, refused)
+                if values:
+                    yield positions, values
+                positions = everyone
+                values, level, refused, claimed = {}, None, False, False
+                continue
+            if word == "for" or (word == "the" and claimed):
+                claimed = True
+                continue
+            claimed = False
+            if item and item.kind == "topping":
+                toppings = values.setdefault("toppings", [[]])[0]
+                if item.name not in toppings:
+                    toppings.append(item.name)
+            elif word in self.sizes:
+                values.setdefault("size", []).append(word)
+            elif word in LEVELS:
+                level = word
+            elif word in ("ice", "sugar"):
+                if level:
+                    values.setdefault(word, []).append(level)
+                level, refused = None, False # "no ice" is not "no toppings"
+            elif word in NO_TOPPINGS:
+                refused = True
+                continue
+            if refused and "toppings" not in values:
+                values["toppings"] = [["nothing"]]
+            refused = False
+        values = _settled(values, level, refused)
+        if values:
+            yield positions, values
+
+
+# dictof Str: listof Any, Str or None, Bool -> dictof Str: listof Any
+# values, with what a part of an answer left hanging at its end: a "no" is
+# no toppings, and a level on its own ("normal") is for whichever of ice and
+# sugar the part did not mention
+def _settled(values, level, refused):
+    if refused and "toppings" not in values:
+        values["toppings"] = [["nothing"]]
+    if level:
+        for slot in ("ice", "sugar"):
+            values.setdefault(slot, [level])
+    return values
+
+
+# listof Str, Str -> Str
+# "a, b and c"
+def _listed(items, conjunction="and"):
+    items = list(items)
+    if len(items) <= 1:
+        return "".join(items)
+    return f"{', '.join(items[:-1])} {conjunction} {items[-1]}"
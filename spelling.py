@@ -0,0 +1,56 @@
+from functools import lru_cache
+
+# Symmetric-delete index used by BTBot.reply_cleaner to autocorrect words that
+# are exactly one edit (insertion, deletion or substitution) away from a word
+# in the bot's vocabulary. Built once per vocabulary, instead of running
+# edit_distance against every vocabulary word for every token.
+
+
+# Str -> listof (Int, Str)
+# every string produced by deleting one character, with the deleted position
+def _deletes(word):
+    return [(i, word[:i] + word[i+1:]) for i in range(len(word))]
+
+
+class CorrectionIndex:
+    # listof Str
+    def __init__(self, vocabulary):
+        self.vocabulary = list(vocabulary)
+        self.rank = {}        # word -> position of first occurrence
+        self.deleted = {}     # word with one char deleted -> words
+        self.substituted = {} # (position, word with that char deleted) -> words
+        for rank, word in enumerate(self.vocabulary):
+            if word in self.rank:
+                continue
+            self.rank[word] = rank
+            for i, shorter in _deletes(word):
+                self.deleted.setdefault(shorter, []).append(word)
+                self.substituted.setdefault((i, shorter), []).append(word)
+        self.cache = {}
+        self.cache_size = 4096
+
+    # Str -> Str or None
+    # the first vocabulary word (in vocabulary order) at edit distance exactly
+    # 1 from token, which is what the original nested edit_distance loop
+    # settled on, or None if there is no such word
+    def lookup(self, token):
+        if token in self.cache:
+            return self.cache[token]
+        candidates = set(self.deleted.get(token, ()))   # token missing a char
+        for i, shorter in _deletes(token):
+            if shorter in self.rank:                    # token has an extra char
+                candidates.add(shorter)
+            for word in self.substituted.get((i, shorter), ()):
+                if word != token:                       # one char swapped
+                    candidates.add(word)
+        correction = min(candidates, key=self.rank.get, default=None)
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[token] = correction
+        return correction
+
+
+# tuple of Str -> CorrectionIndex
+@lru_cache(maxsize=8)
+def correction_index(vocabulary):
+    return CorrectionIndex(vocabulary)
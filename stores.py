@@ -0,0 +1,186 @@
+import datetime
+import json
+import math
+import os
+from collections import namedtuple
+
+import numpy as np
+
+import geo
+
+# Our locations, and which one delivers to a customer: the nearest store that
+# is open, with its own delivery speed. Stores are kept in a KD-tree over
+# their positions as 3D points on the unit sphere, where straight-line
+# distance grows with great-circle distance, so the tree finds the nearest
+# store exactly while only looking at the stores close by. Many deliveries
+# are routed at once with one vectorized haversine over every store instead.
+
+STORES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "data", "stores.json")
+DAY = 24 * 60 # minutes
+
+# opens and closes are minutes after midnight; a store closing at or before
+# it opens closes after midnight
+Store = namedtuple('Store', ['id', 'name', 'postal', 'latitude', 'longitude',
+                             'opens', 'closes', 'speed'])
+
+
+# Str -> Int
+# "HH:MM" as minutes after midnight
+def minute_of_day(clock_time):
+    hours, minutes = clock_time.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+# array of Float, array of Float -> array of Float with shape (..., 3)
+def unit_vectors(latitude, longitude):
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon),
+                     np.sin(lat)], axis=-1)
+
+
+class StoreRegistry:
+    # listof Store; clock gives the current datetime (tests and replays pass
+    # a fixed one)
+    def __init__(self, stores, clock=datetime.datetime.now):
+        self.stores = list(stores)
+        self.clock = clock
+        self.latitudes = np.array([store.latitude for store in self.stores])
+        self.longitudes = np.array([store.longitude for store in self.stores])
+        self.speeds = np.array([store.speed for store in self.stores], float)
+        self.opens = np.array([store.opens for store in self.stores])
+        self.closes = np.array([store.closes for store in self.stores])
+        self.points = [tuple(map(float, point)) for point in
+                       unit_vectors(self.latitudes, self.longitudes)]
+        self.tree = self._build(list(range(len(self.stores))), 0)
+
+    # listof Int, Int -> tree
+    # a node is (store id, axis, subtree below, subtree above), None is empty
+    def _build(self, store_ids, axis):
+        if not store_ids:
+            return None
+        store_ids.sort(key=lambda store_id: self.points[store_id][axis])
+        middle = len(store_ids) // 2
+        below = self._build(store_ids[:middle], (axis + 1) % 3)
+        above = self._build(store_ids[middle + 1:], (axis + 1) % 3)
+        return (store_ids[middle], axis, below, above)
+
+    # Str -> StoreRegistry
+    @classmethod
+    def load(cls, path=STORES_PATH, **kwargs):
+        with open(path) as fixture:
+            stores = [Store(number, store["name"], store["postal"],
+                            store["latitude"], store["longitude"],
+                            minute_of_day(store["opens"]),
+                            minute_of_day(store["closes"]), store["speed"])
+                      for number, store in enumerate(json.load(fixture))]
+        return cls(stores, **kwargs)
+
+    # datetime or None -> Int
+    def _minute(self, now):
+        now = now or self.clock()
+        return now.hour * 60 + now.minute
+
+    # Int -> array of Bool, which stores are open at minute of the day
+    def open_at(self, minute):
+        after_opening = (minute - self.opens) % DAY
+        return after_opening < (self.closes - self.opens - 1) % DAY + 1
+
+    # Int -> array of Int, minutes until each store opens (0 if open)
+    def wait_at(self, minute):
+        return np.where(self.open_at(minute), 0, (self.opens - minute) % DAY)
+
+    # Float, Float, array of Bool or None -> (Store, Float) or None
+    # the nearest store among those allowed (all by default) and its
+    # distance in km
+    def nearest(self, latitude, longitude, allowed=None):
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        point = (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon),
+                 math.sin(lat))
+        if allowed is not None:
+            allowed = allowed.tolist()
+        best, chord = self._search(self.tree, point, allowed, (None, math.inf))
+        if best is None:
+            return None
+        # the great-circle distance subtending that chord
+        return (self.stores[best],
+                2 * math.asin(min(chord / 2, 1.0)) * geo.EARTH_RADIUS)
+
+    # tree, (Float, Float, Float), listof Bool or None, (Int or None, Float)
+    #   -> (Int or None, Float)
+    # the nearest allowed store in node's subtree, or best if it is nearer
+    def _search(self, node, point, allowed, best):
+        if node is None:
+            return best
+        store_id, axis, below, above = node
+        here = self.points[store_id]
+        if allowed is None or allowed[store_id]:
+            chord = math.dist(here, point)
+            if chord < best[1]:
+                best = (store_id, chord)
+        gap = point[axis] - here[axis]
+        near, far = (below, above) if gap < 0 else (above, below)
+        best = self._search(near, point, allowed, best)
+        # the other side can only be nearer if the splitting plane is
+        if abs(gap) < best[1]:
+            best = self._search(far, point, allowed, best)
+        return best
+
+    # Float, Float, datetime or None -> (Store, Int)
+    # the store delivering to a customer at latitude, longitude and the
+    # minutes it will take: the nearest open store or, when every store is
+    # closed, the nearest one, counting the wait until it opens
+    def route_coordinates(self, latitude, longitude, now=None):
+        minute = self._minute(now)
+        found = self.nearest(latitude, longitude, self.open_at(minute))
+        wait = 0
+        if found is None:
+            found = self.nearest(latitude, longitude)
+            wait = int(self.wait_at(minute)[found[0].id])
+        store, km = found
+        return store, round(geo.travel_minutes(km, store.speed)) + wait
+
+    # Str, Geocoder, datetime or None -> (Store, Int)
+    def route(self, postal_code, geocoder, now=None):
+        latitude, longitude = geocoder.coordinates(postal_code)
+        return self.route_coordinates(latitude, longitude, now)
+
+    # listof Str, Geocoder, datetime or None, Int
+    #   -> (array of Int, array of Float)
+    # the store (-1 for unknown codes) and ETA in minutes (NaN for unknown
+    # codes) of every delivery, routed like route() but all at once
+    def batch_route(self, postal_codes, geocoder, now=None, chunk_size=None):
+        # about a million distances per chunk
+        chunk_size = chunk_size or max(1, 2**20 // max(len(self.stores), 1))
+        found, known = geocoder.positions(postal_codes)
+        rows = geocoder.table[found]
+        minute = self._minute(now)
+        is_open = self.open_at(minute)
+        wait = self.wait_at(minute)
+        store_ids = np.empty(len(rows), dtype=np.int64)
+        minutes = np.empty(len(rows))
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            km = geo.haversine_km(chunk['latitude'][:, None],
+                                  chunk['longitude'][:, None],
+                                  self.latitudes, self.longitudes)
+            if is_open.any():
+                nearest = np.argmin(np.where(is_open, km, np.inf), axis=1)
+            else:
+                nearest = np.argmin(km, axis=1)
+            chosen = km[np.arange(len(chunk)), nearest]
+            store_ids[start:start + chunk_size] = nearest
+            minutes[start:start + chunk_size] = np.round(geo.travel_minutes(
+                chosen, self.speeds[nearest])) + wait[nearest]
+        return (np.where(known, store_ids, -1),
+                np.where(known, minutes, np.nan))
+
+
+_registry = None
+
+# the process-wide StoreRegistry, loaded on first use
+def default_registry():
+    global _registry
+    if _registry is None:
+        _registry = StoreRegistry.load()
+    return _registry
@@ -0,0 +1,62 @@
+import re
+
+# The word pipeline every utterance goes through once: split into words, then
+# autocorrect, then resolve what is still misspelled against the menu, then
+# keep only the words the bot cares about. Words are plain strs, and a
+# CleanedText carries the corrected ones so later stages need not split the
+# utterance again.
+
+WORD = re.compile(r'\w+')
+
+
+# Str -> listof Str
+def tokenize(text):
+    return WORD.findall(text)
+
+
+# iterable of Str, CorrectionIndex -> iterable of Str
+def corrected(words, index, skip=("no",)): # "no" is too easy to autocorrect incorrectly
+    for word in words:
+        replacement = None if word in skip else index.lookup(word)
+        yield replacement or word
+
+
+# listof Str, FuzzyResolver, setof Str -> listof Str
+# replaces, in place, words still misspelled after corrected() with the menu
+# words they resolve to; words in known are kept as they are. The whole
+# utterance is resolved in one call, and only if some word needs it.
+def resolved(words, resolver, known=frozenset()):
+    unknown = [position for position, word in enumerate(words)
+               if word not in known and resolver.candidate(word)]
+    if unknown:
+        found = resolver.resolve([words[position] for position in unknown])
+        for position, word in zip(unknown, found):
+            if word:
+                words[position] = word
+    return words
+
+
+# iterable of Str, setof Str -> iterable of Str
+def keywords_only(words, keywords):
+    for word in words:
+        if word in keywords:
+            yield word
+
+
+# The cleaned-up utterance, as a string of corrected words joined by spaces,
+# that also carries those words so later stages need not tokenize it again.
+class CleanedText(str):
+    __slots__ = ("words",)
+
+    # listof Str, kept as given
+    def __new__(cls, words):
+        cleaned = super().__new__(cls, " ".join(words))
+        cleaned.words = words
+        return cleaned
+
+
+# Str -> iterable of Str
+def words_of(text):
+    if isinstance(text, CleanedText):
+        return text.words
+    return tokenize(text)
@@ -0,0 +1,177 @@
+import asyncio
+
+# Transports carry a conversation between BTBot and one customer. The bot only
+# calls send() to say something and ask() to say something and wait for the
+# customer's answer; a transport raises EOFError once the customer is gone.
+
+# what the customer is told when their conversation is lost on our side
+LOST = ("Sorry, something went wrong on our side and we lost your "
+        "conversation. Please start again!")
+
+
+class Transport:
+    # Str -> None
+    async def send(self, text):
+        raise NotImplementedError
+
+    # -> Str
+    async def receive(self):
+        raise NotImplementedError
+
+    # Str -> Str
+    async def ask(self, prompt):
+        await self.send(prompt)
+        return await self.receive()
+
+    async def close(self):
+        pass
+
+    # waits until the customer has said something, holding it for the next
+    # receive(); lets an idle session wait without its bot
+    async def wait_readable(self):
+        raise NotImplementedError
+
+
+# The terminal, as the bot has always been used. input() runs in a worker
+# thread so a waiting customer does not block the event loop. A read that
+# was given up on (an idle session) keeps running, and whatever it reads is
+# the answer to the next ask(), so no line is lost.
+class StdioTransport(Transport):
+    def __init__(self):
+        self.pending = None # the input() still running, if any
+
+    async def send(self, text):
+        print(text)
+
+    async def receive(self):
+        return await self.ask("")
+
+    async def ask(self, prompt):
+        if self.pending is None:
+            loop = asyncio.get_running_loop()
+            self.pending = loop.run_in_executor(None, input, prompt)
+        elif prompt:
+            print(prompt, end="", flush=True)
+        line = await asyncio.shield(self.pending)
+        self.pending = None
+        return line
+
+    async def wait_readable(self):
+        if self.pending is None:
+            loop = asyncio.get_running_loop()
+            self.pending = loop.run_in_executor(None, input, "")
+        await asyncio.shield(self.pending)
+
+
+AWAITING_REPLY = object() # the bot is waiting for the customer
+CLOSED = object()         # the conversation is over
+NOTHING_HELD = object()   # no message held by wait_readable()
+
+
+# An in-process customer, driven by code rather than a person. The bot's side
+# uses send/receive; the customer's side uses replies/turn/hang_up.
+class MemoryTransport(Transport):
+    def __init__(self):
+        self.inbox = asyncio.Queue()  # customer -> bot
+        self.outbox = asyncio.Queue() # bot -> customer
+        self.closed = False
+        self.awaiting = False # AWAITING_REPLY sent, no reply received yet
+        self.held = NOTHING_HELD
+
+    async def send(self, text):
+        self.outbox.put_nowait(text)
+
+    async def receive(self):
+        # a receive cancelled and retried still announces the wait only once
+        if not self.awaiting:
+            await self.send(AWAITING_REPLY)
+            self.awaiting = True
+        if self.held is NOTHING_HELD:
+            text = await self.inbox.get()
+        else:
+            text, self.held = self.held, NOTHING_HELD
+        self.awaiting = False
+        if text is None:
+            raise EOFError("customer hung up")
+        return text
+
+    async def wait_readable(self):
+        if self.held is NOTHING_HELD:
+            self.held = await self.inbox.get()
+
+    async def close(self):
+        await self.send(CLOSED)
+
+    # -> listof Str
+    # everything the bot says until it waits for the customer or hangs up
+    async def replies(self):
+        said = []
+        while not self.closed:
+            text = await self.outbox.get()
+            if text is AWAITING_REPLY:
+                break
+            elif text is CLOSED:
+                self.closed = True
+            else:
+                said.append(text)
+        return said
+
+    # Str -> listof Str
+    async def turn(self, text):
+        self.inbox.put_nowait(text)
+        return await self.replies()
+
+    def hang_up(self):
+        self.inbox.put_nowait(None)
+
+
+# The bot's end of a conversation whose customer is connected to another
+# process, as in sharding.Dispatcher. What the bot says goes down the
+# multiprocessing Connection tagged with the session id, as a plain str (the
+# bot sometimes says a tokens.CleanedText); the dispatcher puts the
+# customer's lines in the inbox.
+class PipeTransport(MemoryTransport):
+    def __init__(self, conn, session_id):
+        super().__init__()
+        self.conn = conn
+        self.session_id = session_id
+
+    async def send(self, text):
+        if text is AWAITING_REPLY:
+            self.conn.send(("ready", self.session_id))
+        elif text is CLOSED:
+            self.conn.send(("end", self.session_id))
+        else:
+            self.conn.send(("say", self.session_id, str(text)))
+
+
+# One line per message over a TCP or Unix socket connection.
+class SocketTransport(Transport):
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.held = None # a line read by wait_readable()
+
+    async def send(self, text):
+        self.writer.write(text.encode() + b"\n")
+        await self.writer.drain()
+
+    async def receive(self):
+        if self.held is None:
+            line = await self.reader.readline()
+        else:
+            line, self.held = self.held, None
+        if not line:
+            raise EOFError("connection closed")
+        return line.decode().rstrip("\r\n")
+
+    async def wait_readable(self):
+        if self.held is None:
+            self.held = await self.reader.readline()
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass